@@ -5,8 +5,9 @@ Handles the core logic for tracking user actions and calculating APM/APS statist
 
 import time
 import threading
-from collections import deque
-from typing import Dict, Optional, Union, Any, List, Callable
+from typing import Dict, Optional, Union, Any, Callable, Set, Iterable, Tuple
+
+import numpy as np
 from pynput import mouse, keyboard  # type: ignore
 
 
@@ -14,6 +15,79 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger()
 
+_NS_PER_SECOND = 1_000_000_000
+# Metrics computed within the same 10 ms bucket are reused
+_METRICS_TTL_NS = 10_000_000
+
+
+class TimestampBuffer:
+    """
+    Contiguous int64 buffer of non-decreasing action timestamps (nanoseconds).
+    Old entries are dropped by advancing a start index; the live region is
+    compacted to the front (or the array doubled) only when the end is reached.
+    Window counts are binary searches instead of scans over Python floats.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self._buf: np.ndarray = np.empty(capacity, dtype=np.int64)
+        self._start: int = 0
+        self._end: int = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def append(self, timestamp: int) -> None:
+        """Add a timestamp (must not be older than the last one)."""
+        if self._end == len(self._buf):
+            self._make_room(1)
+        self._buf[self._end] = timestamp
+        self._end += 1
+
+    def extend(self, timestamps: Iterable[int]) -> None:
+        """Add several timestamps, in chronological order."""
+        values = np.fromiter(timestamps, dtype=np.int64)
+        if self._end + len(values) > len(self._buf):
+            self._make_room(len(values))
+        self._buf[self._end : self._end + len(values)] = values
+        self._end += len(values)
+
+    def is_full(self) -> bool:
+        """Whether the next append has to compact or grow the array."""
+        return self._end == len(self._buf)
+
+    def clear(self) -> None:
+        """Drop all timestamps."""
+        self._start = 0
+        self._end = 0
+
+    def view(self) -> np.ndarray:
+        """The live timestamps, oldest first (a view, not a copy)."""
+        return self._buf[self._start : self._end]
+
+    def drop_before(self, cutoff: int) -> None:
+        """Discard timestamps older than cutoff."""
+        self._start += int(np.searchsorted(self.view(), cutoff))
+
+    def drop_first(self, count: int) -> None:
+        """Discard the `count` oldest timestamps."""
+        self._start = min(self._start + count, self._end)
+
+    def _make_room(self, needed: int) -> None:
+        """Move live entries to the front; double the array if over half full."""
+        size = len(self)
+        capacity = len(self._buf)
+        if size + needed > capacity // 2:
+            while size + needed > capacity // 2:
+                capacity *= 2
+            buf = np.empty(capacity, dtype=np.int64)
+            buf[:size] = self.view()
+            self._buf = buf
+        else:
+            # numpy buffers overlapping copies, so this is a safe in-place shift
+            self._buf[:size] = self.view()
+        self._start = 0
+        self._end = size
+
 
 class APMCalculator:
     """
@@ -27,10 +101,12 @@ class APMCalculator:
         self._lock = threading.Lock()
 
         # Core tracking data structures
-        self.actions: deque[float] = deque()  # Stores timestamps of recent actions
+        self.actions = TimestampBuffer()  # Timestamps of recent actions, oldest first
         self.total_actions: int = 0  # Total actions in current session
-        self.session_start: Optional[float] = None  # Session start timestamp
+        # Session start, on the same time.perf_counter_ns() clock as the actions
+        self.session_start: Optional[int] = None
         self.running: bool = False  # Tracking state
+        self._pressed_keys: Set[Any] = set()  # Keys currently held down
 
         # Configuration
         self.window_size: int = window_size
@@ -39,26 +115,51 @@ class APMCalculator:
         self.mouse_listener: Optional[mouse.Listener] = None
         self.keyboard_listener: Optional[keyboard.Listener] = None
 
-        # Observers
-        self._observers: List[Callable[[Dict[str, Any]], None]] = []
+        # Observers: an insertion-ordered dict used as a set (O(1) membership),
+        # plus an immutable tuple snapshot replaced on (un)registration so the
+        # update loop iterates a consistent view without locking
+        self._observers: Dict[Callable[[Dict[str, Any]], None], None] = {}
+        self._observer_snapshot: Tuple[Callable[[Dict[str, Any]], None], ...] = ()
         self._update_thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        self._stop: bool = False  # Set by stop(), read by the update loop
+
+        # Flush trigger: wake the update loop early on bursts of activity
+        # (every `flush_every` actions or after `flush_interval` seconds)
+        self._flush_event = threading.Event()
+        self.update_interval: float = 0.1
+        self.flush_every: int = 10
+        self.flush_interval: float = 0.05
+        self._pending_actions: int = 0
+        # perf_counter_ns() has an arbitrary origin, so "never flushed" is a
+        # sentinel far in the past rather than 0
+        self._last_flush: int = -(1 << 62)
+
+        # Last computed metrics and the (time bucket, session start, total
+        # actions, buffered actions) state they were computed from
+        self._cached_metrics: Optional[Dict[str, Union[float, int]]] = None
+        self._cached_key: Optional[Tuple[int, int, int, int]] = None
 
     def add_observer(self, callback: Callable[[Dict[str, Any]], None]) -> None:
         """Register an observer callback."""
-        if callback not in self._observers:
-            self._observers.append(callback)
+        with self._lock:
+            if callback not in self._observers:
+                self._observers[callback] = None
+                self._observer_snapshot = tuple(self._observers)
 
     def remove_observer(self, callback: Callable[[Dict[str, Any]], None]) -> None:
         """Unregister an observer callback."""
-        if callback in self._observers:
-            self._observers.remove(callback)
+        with self._lock:
+            if callback in self._observers:
+                del self._observers[callback]
+                self._observer_snapshot = tuple(self._observers)
 
     def _notify_observers(self) -> None:
         """Notify all observers with current metrics."""
         try:
+            # One metrics dict per tick. Observers (un)registered from other
+            # threads take effect on the next tick.
             metrics = self.get_metrics()
-            for callback in self._observers:
+            for callback in self._observer_snapshot:
                 try:
                     callback(metrics)
                 except Exception as e:
@@ -76,19 +177,22 @@ class APMCalculator:
             return
 
         self.running = True
-        self.session_start = time.time()
+        self.session_start = time.perf_counter_ns()
         self.actions.clear()
         self.total_actions = 0
+        self._pressed_keys.clear()
 
         # Start listeners
         self.mouse_listener = mouse.Listener(on_click=self._on_click)
-        self.keyboard_listener = keyboard.Listener(on_press=self._on_press)
+        self.keyboard_listener = keyboard.Listener(
+            on_press=self._on_press, on_release=self._on_release
+        )
 
         self.mouse_listener.start()
         self.keyboard_listener.start()
 
         # Start update loop thread
-        self._stop_event.clear()
+        self._stop = False
         self._update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self._update_thread.start()
 
@@ -98,7 +202,8 @@ class APMCalculator:
             return
 
         self.running = False
-        self._stop_event.set()
+        self._stop = True
+        self._flush_event.set()  # Wake the update loop so it exits promptly
 
         if self.mouse_listener:
             self.mouse_listener.stop()
@@ -111,12 +216,26 @@ class APMCalculator:
     def _update_loop(self) -> None:
         """Background loop to calculate and notify metrics."""
         logger.info("Starting update loop thread")
-        while not self._stop_event.is_set():
+        # Ticks are anchored to a monotonic schedule so the cadence does not drift
+        # by the time spent notifying observers
+        interval = self.update_interval
+        next_tick = time.monotonic() + interval
+        while not self._stop:
+            # Sleep until the next tick, or earlier if _record_action requests a flush
+            self._flush_event.wait(timeout=max(0.0, next_tick - time.monotonic()))
+            self._flush_event.clear()
+            if self._stop:
+                break
+
+            now = time.monotonic()
+            if now >= next_tick:
+                # Stay on the schedule; ticks missed under load are skipped, not replayed
+                next_tick += interval * (int((now - next_tick) / interval) + 1)
+
             try:
                 self._notify_observers()
             except Exception as e:
                 logger.error("Unexpected error in update loop: %s", e, exc_info=True)
-            time.sleep(0.1)  # 100ms update rate
         logger.info("Update loop thread stopped")
 
     def reset(self) -> None:
@@ -124,25 +243,41 @@ class APMCalculator:
         with self._lock:
             self.actions.clear()
             self.total_actions = 0
-            self.session_start = time.time() if self.running else None
+            self.session_start = time.perf_counter_ns() if self.running else None
 
     def _record_action(self) -> None:
         """Record an action timestamp safely."""
         if not self.running:
             return
 
-        current_time = time.time()
+        # Monotonic integer nanoseconds: immune to wall-clock adjustments
+        current_time = time.perf_counter_ns()
+        # Mouse and keyboard listeners run on separate threads, so appends stay
+        # serialised; the critical section is kept to a few stores. Window
+        # cleanup is done by the consumer in get_metrics.
         with self._lock:
+            if self.actions.is_full():
+                # Only evict when the buffer would otherwise have to grow, so
+                # memory stays bounded even if get_metrics is not called
+                self.actions.drop_before(
+                    current_time - (self.window_size + 10) * _NS_PER_SECOND
+                )
             self.actions.append(current_time)
             self.total_actions += 1
 
-            # Optimization: Remove old actions immediately to prevent memory growth
-            # We keep a bit more than window_size just in case, but strict cleanup happens in calculate
-            # This ensures we never grow indefinitely even if get_metrics is not called
-            while (
-                self.actions and current_time - self.actions[0] > self.window_size + 10
-            ):
-                self.actions.popleft()
+            # Request an early update on bursts, or on the first action after a pause
+            self._pending_actions += 1
+            flush = (
+                self._pending_actions >= self.flush_every
+                or current_time - self._last_flush
+                >= self.flush_interval * _NS_PER_SECOND
+            )
+            if flush:
+                self._pending_actions = 0
+                self._last_flush = current_time
+
+        if flush:
+            self._flush_event.set()
 
     def _on_click(self, _x: int, _y: int, _button: Any, pressed: bool) -> None:
         """Mouse click handler."""
@@ -152,13 +287,36 @@ class APMCalculator:
         except Exception as e:
             logger.error("Error in mouse listener: %s", e, exc_info=True)
 
-    def _on_press(self, _key: Any) -> None:
-        """Keyboard press handler."""
+    def _on_press(self, key: Any) -> None:
+        """Keyboard press handler. OS auto-repeat of a held key is not counted."""
         try:
+            key = self._key_id(key)
+            if key in self._pressed_keys:
+                return
+            self._pressed_keys.add(key)
             self._record_action()
         except Exception as e:
             logger.error("Error in keyboard listener: %s", e, exc_info=True)
 
+    def _on_release(self, key: Any) -> None:
+        """Keyboard release handler."""
+        try:
+            self._pressed_keys.discard(self._key_id(key))
+        except Exception as e:
+            logger.error("Error in keyboard listener: %s", e, exc_info=True)
+
+    def _key_id(self, key: Any) -> Any:
+        """
+        Identify the physical key, so its press and release match whatever the
+        modifiers: the virtual key code when known (Shift+1 and 1 share it),
+        else the listener's canonical form of the key.
+        """
+        vk = getattr(key, "vk", None)
+        if vk is not None:
+            return vk
+        listener = self.keyboard_listener
+        return listener.canonical(key) if listener is not None else key
+
     def get_metrics(self) -> Dict[str, Union[float, int]]:
         """
         Calculate and return current metrics.
@@ -173,32 +331,45 @@ class APMCalculator:
                 "session_time": 0,
             }
 
-        current_time = time.time()
-        session_duration = current_time - self.session_start
-
-        # Snapshot data within lock to minimize contention with input threads
+        current_time = time.perf_counter_ns()
+        tick = current_time // _METRICS_TTL_NS
+        # Repeated reads in one bucket with no new action reuse the last result
+        cached = self._cached_metrics
+        if cached is not None and self._cached_key == (
+            tick,
+            self.session_start,
+            self.total_actions,
+            len(self.actions),
+        ):
+            return cached
+
+        session_start = self.session_start
+        session_duration = (current_time - session_start) / _NS_PER_SECOND
+
+        # Window counts are binary searches over the sorted timestamps, cheap
+        # enough to run while holding the lock
         with self._lock:
+            # Both cutoffs (APM window and last 10 seconds for APS) in one search
+            view = self.actions.view()
+            window_start, aps_start = np.searchsorted(
+                view,
+                (
+                    current_time - self.window_size * _NS_PER_SECOND,
+                    current_time - 10 * _NS_PER_SECOND,
+                ),
+            )
+
             # Clean up old actions for accurate sliding window calculation
-            while self.actions and current_time - self.actions[0] > self.window_size:
-                self.actions.popleft()
+            self.actions.drop_first(int(window_start))
 
-            # Copy data for calculation outside lock (fast C-level copy)
-            actions_snapshot = list(self.actions)
+            recent_actions_count = len(view) - int(window_start)
+            # Calculate APS (Actions Per Second) - last 10 seconds
+            aps_actions = len(view) - int(max(window_start, aps_start))
             total_actions_snapshot = self.total_actions
+            key = (tick, session_start, total_actions_snapshot, len(self.actions))
 
         # --- Calculations performed without holding the lock ---
 
-        recent_actions_count = len(actions_snapshot)
-
-        # Calculate APS (Actions Per Second) - last 10 seconds
-        # We iterate backwards to be faster
-        aps_actions = 0
-        for timestamp in reversed(actions_snapshot):
-            if current_time - timestamp <= 10:
-                aps_actions += 1
-            else:
-                break
-
         # Calculate Current APM
         time_window = min(self.window_size, session_duration)
         if time_window > 0:
@@ -219,10 +390,13 @@ class APMCalculator:
             else (aps_actions / session_duration if session_duration > 0 else 0)
         )
 
-        return {
+        metrics: Dict[str, Union[float, int]] = {
             "current_apm": round(current_apm, 1),
             "avg_apm": round(avg_apm, 1),
             "aps": round(aps, 1),
             "total_actions": total_actions_snapshot,
             "session_time": int(session_duration),
         }
+        self._cached_metrics = metrics
+        self._cached_key = key
+        return metrics
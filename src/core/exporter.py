@@ -4,13 +4,82 @@ Handles exporting APM data to JSON and TXT files.
 """
 
 import os
+import functools
 import json
+import queue
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, BinaryIO, Callable, Tuple, cast
 from src.utils.logger import setup_logger
 
+try:
+    import orjson
+except ImportError:  # Optional speedup, the stdlib encoder is the fallback
+    orjson = None  # type: ignore[assignment]
+
 logger = setup_logger("Exporter")
 
+# Formats one metric value for the TXT export line
+_ValueFormatter = Callable[[Any], str]
+# Cached TXT field: (label prefix, metrics key, value formatter)
+_TxtField = Tuple[bytes, str, _ValueFormatter]
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_data_dir(data_dir: Optional[str] = None) -> str:
+    """Resolve (and create) the export directory, once per distinct argument."""
+    if data_dir is None:
+        # We need to handle the case where LOCALAPPDATA might not be set, though on Windows it usually is.
+        # Fallback to current directory if not found, or raise error?
+        # For now, let's assume it exists or fallback to a safe default like "."
+        local_app_data = os.getenv("LOCALAPPDATA")
+        if local_app_data:
+            data_dir = os.path.join(local_app_data, "APMLive")
+        else:
+            data_dir = os.path.join(os.getcwd(), "APMLive_Data")
+
+    # Ensure directory exists
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    return data_dir
+
+
+def _dump_json(metrics: Dict[str, Any]) -> bytes:
+    """Serialize metrics to UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return cast(bytes, orjson.dumps(metrics))
+    return json.dumps(metrics).encode("utf-8")
+
+
+# Zero-padded two-digit strings, so durations are built by table lookup
+_PAD: Tuple[str, ...] = tuple(f"{i:02d}" for i in range(100))
+
+
+def _format_duration(total_seconds: int) -> str:
+    """Format a duration in seconds as HH:MM:SS."""
+    hours, remainder = divmod(int(total_seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    hh = _PAD[hours] if hours < 100 else str(hours)
+    return f"{hh}:{_PAD[minutes]}:{_PAD[seconds]}"
+
+
+def _int_str(value: Any) -> str:
+    """Render a metric as a truncated integer."""
+    return str(int(value))
+
+
+# TXT export fields in output order:
+# (setting key, enabled by default, label prefix, metrics key, value formatter)
+_TXT_FIELDS: Tuple[Tuple[str, bool, bytes, str, _ValueFormatter], ...] = (
+    ("timestamp", False, b"TS: ", "timestamp", _int_str),
+    ("apm", True, b"APM: ", "current_apm", _int_str),
+    ("avg_apm", False, b"AVG: ", "avg_apm", _int_str),
+    ("actions_per_second", False, b"APS: ", "aps", str),
+    ("total_actions", True, b"Total: ", "total_actions", str),
+    ("session_time", True, b"Time: ", "session_time", _format_duration),
+)
+
+_TXT_SEPARATOR = b" | "
+
 
 class DataExporter:
     """
@@ -18,27 +87,33 @@ class DataExporter:
     """
 
     def __init__(self, data_dir: Optional[str] = None) -> None:
-        if data_dir is None:
-            # We need to handle the case where LOCALAPPDATA might not be set, though on Windows it usually is.
-            # Fallback to current directory if not found, or raise error?
-            # For now, let's assume it exists or fallback to a safe default like "."
-            local_app_data = os.getenv("LOCALAPPDATA")
-            if local_app_data:
-                self.data_dir = os.path.join(local_app_data, "APMLive")
-            else:
-                self.data_dir = os.path.join(os.getcwd(), "APMLive_Data")
-        else:
-            self.data_dir = data_dir
+        self.data_dir: str = _resolve_data_dir(data_dir)
 
         self.output_file: str = os.path.join(self.data_dir, "apm_data.txt")
         self.json_file: str = os.path.join(self.data_dir, "apm_data.json")
         self.settings_file: str = os.path.join(self.data_dir, "settings.json")
 
-        # Thread management
+        # Thread management: a single long-lived writer thread, started on the
+        # first export. The one-slot queue holds the metrics not written yet;
+        # newer metrics replace them (latest wins). None stops the writer.
         self._export_thread: Optional[threading.Thread] = None
+        self._export_lock = threading.Lock()
+        self._export_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(
+            maxsize=1
+        )
+        self._closed: bool = False
+
+        # Export files stay open between writes and are rewritten in place
+        self._handles: Dict[str, BinaryIO] = {}
+        # Bytes last written to each open file, to skip unchanged rewrites
+        self._written: Dict[str, bytes] = {}
+        self._files_lock = threading.Lock()
+
+        # Enabled TXT fields, rebuilt when the settings change
+        self._txt_fields: Optional[Tuple[_TxtField, ...]] = None
 
         # Default settings
-        self.txt_settings: Dict[str, bool] = {
+        self.txt_settings = {
             "apm": True,
             "total_actions": True,
             "session_time": True,
@@ -47,12 +122,18 @@ class DataExporter:
             "timestamp": False,
         }
 
-        # Ensure directory exists
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-
         self.load_settings()
 
+    @property
+    def txt_settings(self) -> Dict[str, bool]:
+        """TXT export toggles. Change them through update_settings()."""
+        return self._txt_settings
+
+    @txt_settings.setter
+    def txt_settings(self, settings: Dict[str, bool]) -> None:
+        self._txt_settings = settings
+        self._txt_fields = None
+
     def load_settings(self) -> None:
         """Load export settings from JSON file."""
         try:
@@ -60,6 +141,7 @@ class DataExporter:
                 with open(self.settings_file, "r", encoding="utf-8") as f:
                     saved_settings = json.load(f)
                     self.txt_settings.update(saved_settings.get("txt_export", {}))
+                    self._txt_fields = None
         except (IOError, json.JSONDecodeError) as e:
             logger.error("Error loading settings: %s", e)
 
@@ -75,6 +157,7 @@ class DataExporter:
     def update_settings(self, new_settings: Dict[str, bool]) -> None:
         """Update settings and save to disk."""
         self.txt_settings.update(new_settings)
+        self._txt_fields = None
         self.save_settings()
 
     def export(self, metrics: Dict[str, Any]) -> None:
@@ -82,53 +165,110 @@ class DataExporter:
         Write metrics to files based on configuration.
         Should be called periodically.
         """
-        # Prevent thread explosion: only start if previous write is done
-        if self._export_thread and self._export_thread.is_alive():
-            return
+        with self._export_lock:
+            # Shutting down: the files are (being) closed
+            if self._closed:
+                return
 
-        # We run this in a thread to avoid blocking the UI/Calculator if I/O is slow
-        self._export_thread = threading.Thread(
-            target=self._write_files, args=(metrics,), daemon=True
-        )
-        self._export_thread.start()
+            # We write from a thread to avoid blocking the UI/Calculator if I/O is slow
+            if self._export_thread is None:
+                self._export_thread = threading.Thread(
+                    target=self._writer_loop, daemon=True
+                )
+                self._export_thread.start()
 
-    def _write_files(self, metrics: Dict[str, Any]) -> None:
-        try:
-            # 1. JSON Export (always full data)
-            with open(self.json_file, "w", encoding="utf-8") as f:
-                json.dump(metrics, f)
+            # Replace metrics the writer has not picked up yet
+            try:
+                self._export_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._export_queue.put_nowait(metrics)
 
-            # 2. TXT Export (configurable)
-            output_parts = []
+    def _writer_loop(self) -> None:
+        """Write metrics as they are queued (writer thread body)."""
+        while True:
+            metrics = self._export_queue.get()
+            if metrics is None:
+                return
+            try:
+                self._write_files(metrics)
+            except Exception as e:
+                # Keep the single writer alive: a failed export only costs one tick
+                logger.error("Unexpected error exporting data: %s", e, exc_info=True)
 
-            if self.txt_settings.get("timestamp", False):
-                output_parts.append(f"TS: {int(metrics.get('timestamp', 0))}")
+    def _render_txt(self, metrics: Dict[str, Any]) -> bytes:
+        """Render the TXT export line according to txt_settings."""
+        fields = self._txt_fields
+        if fields is None:
+            # Resolve the enabled fields once instead of on every export
+            fields = self._txt_fields = tuple(
+                (prefix, key, fmt)
+                for setting, default, prefix, key, fmt in _TXT_FIELDS
+                if self.txt_settings.get(setting, default)
+            )
 
-            if self.txt_settings.get("apm", True):
-                output_parts.append(f"APM: {int(metrics.get('current_apm', 0))}")
+        return _TXT_SEPARATOR.join(
+            [
+                prefix + fmt(metrics.get(key, 0)).encode("utf-8")
+                for prefix, key, fmt in fields
+            ]
+        )
 
-            if self.txt_settings.get("avg_apm", False):
-                output_parts.append(f"AVG: {int(metrics.get('avg_apm', 0))}")
+    def _write_files(self, metrics: Dict[str, Any]) -> None:
+        try:
+            # Render every payload up front so the sinks are written back-to-back
+            # and no formatting work happens while a file is open/truncated.
+            # 1. JSON Export (always full data), 2. TXT Export (configurable)
+            payloads = (
+                (self.json_file, _dump_json(metrics)),
+                (self.output_file, self._render_txt(metrics)),
+            )
 
-            if self.txt_settings.get("actions_per_second", False):
-                output_parts.append(f"APS: {metrics.get('aps', 0)}")
+            with self._files_lock:
+                for path, content in payloads:
+                    self._rewrite(path, content)
 
-            if self.txt_settings.get("total_actions", True):
-                output_parts.append(f"Total: {metrics.get('total_actions', 0)}")
+        except (IOError, TypeError, ValueError) as e:
+            logger.error("Export error: %s", e)
 
-            if self.txt_settings.get("session_time", True):
-                # Format time HH:MM:SS
-                total_seconds = int(metrics.get("session_time", 0))
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-                time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                output_parts.append(f"Time: {time_str}")
+    def _rewrite(self, path: str, content: bytes) -> None:
+        """Replace the contents of an export file through its persistent handle."""
+        if self._written.get(path) == content:
+            return  # Already on disk, e.g. an idle tick within the same second
 
-            content = " | ".join(output_parts)
+        f = self._handles.get(path)
+        if f is None:
+            f = open(path, "wb")  # pylint: disable=consider-using-with
+            self._handles[path] = f
+        try:
+            f.seek(0)
+            f.write(content)
+            f.truncate()
+            f.flush()
+        except IOError:
+            # Reopen on the next write in case the handle went bad
+            del self._handles[path]
+            self._written.pop(path, None)
+            f.close()
+            raise
+        self._written[path] = content
 
-            with open(self.output_file, "w", encoding="utf-8") as f:
-                f.write(content)
+    def close(self) -> None:
+        """Stop the writer thread, then close the export files. Exports end here."""
+        with self._export_lock:
+            self._closed = True
+            thread = self._export_thread
+            if thread is not None:
+                # Queued after any pending metrics, which are still written
+                self._export_queue.put(None)
+        if thread is not None:
+            thread.join()
 
-        except (IOError, TypeError, ValueError) as e:
-            logger.error("Export error: %s", e)
+        with self._files_lock:
+            for f in self._handles.values():
+                try:
+                    f.close()
+                except IOError as e:
+                    logger.error("Error closing export file: %s", e)
+            self._handles.clear()
+            self._written.clear()
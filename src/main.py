@@ -14,7 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # pylint: disable=wrong-import-position
 from src.core.calculator import APMCalculator
 from src.ui.main_window import MainWindow
-from src.utils.logger import setup_logger
+from src.utils.logger import setup_logger, shutdown_logger
 
 logger = setup_logger()
 
@@ -45,15 +45,18 @@ def main() -> None:
         calculator = APMCalculator()
 
         # Initialize UI
-        _app = MainWindow(root, calculator)
+        app = MainWindow(root, calculator)
 
         # Start Application
         root.mainloop()
+        app.exporter.close()
     except Exception as e:
         logger.critical("Fatal error in main loop: %s", e, exc_info=True)
         sys.exit(1)
     finally:
         logger.info("Application stopped")
+        shutdown_logger("Exporter")
+        shutdown_logger()
 
 
 if __name__ == "__main__":
@@ -4,9 +4,14 @@ Implements a lightweight real-time graph widget using Tkinter Canvas.
 """
 
 import tkinter as tk
-from collections import deque
-from typing import Deque, List, Any, Optional
-from src.utils.config import AppColors
+import tkinter.font as tkfont
+import math
+import time
+from typing import List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.utils.config import AppColors, AppFonts
 
 
 class GraphWidget(tk.Canvas):
@@ -15,6 +20,15 @@ class GraphWidget(tk.Canvas):
     Replaces heavy Matplotlib for real-time plotting.
     """
 
+    # (upper y_max bound, grid step) pairs giving about 4-5 "nice" grid lines
+    _TICK_LADDER: Tuple[Tuple[int, int], ...] = (
+        (100, 25),
+        (250, 50),
+        (500, 100),
+        (1000, 200),
+        (2500, 500),
+    )
+
     def __init__(
         self,
         master: tk.Misc,
@@ -35,24 +49,63 @@ class GraphWidget(tk.Canvas):
         self.max_points: int = (
             60  # Store 60 seconds of data (assuming ~1 update/sec) or more if higher freq
         )
-        self.data: Deque[float] = deque(
-            maxlen=600
-        )  # Store more points for smoothness if needed
+        self.capacity: int = 600  # Store more points for smoothness if needed
+
+        # Ring buffer of samples: _head is the next write slot, _count the fill level
+        self._ybuf: np.ndarray = np.zeros(self.capacity, dtype=np.float64)
+        self._head: int = 0
+        self._count: int = 0
+
+        # Running maximum of the buffered samples for autoscaling. It is only
+        # rescanned after the current maximum has been evicted from the ring.
+        self._running_max: float = 0.0
+        self._max_stale: bool = False
 
         # Viewport settings
         self.y_min: float = 0.0
         self.y_max: float = 100.0
+        self._ticks: Tuple[Tuple[float, str], ...] = self._compute_ticks()
         self.padding_top: int = 20
         self.padding_bottom: int = 20
         self.padding_left: int = 40  # Space for labels
         self.padding_right: int = 10
 
+        # Preallocated [x0, y0, x1, y1, ...] scratch for the polyline. X slots are
+        # filled only when the width changes; Y slots are rewritten in place.
+        self._coords: np.ndarray = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._layout_x()
+
         # Grid lines
         self.grid_lines_ids: List[int] = []
         self.label_ids: List[int] = []
 
-        # The main data line
-        self.line_id: Optional[int] = None
+        # The main data line: one persistent item, moved with coords() and
+        # hidden while there is nothing to plot
+        self.line_id: int = self.create_line(
+            0,
+            0,
+            0,
+            0,
+            fill=AppColors.ACCENT,
+            width=2,
+            smooth=True,
+            state=tk.HIDDEN,
+            tags="line",
+        )
+        self._line_visible: bool = False
+
+        # Coordinates currently on screen (first _drawn_len entries are valid)
+        self._drawn: np.ndarray = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._drawn_len: int = 0
+
+        # Pending redraw, so several samples between two paints cost a single draw.
+        # Repaints are capped at one per min_redraw_interval seconds (~4 Hz).
+        self._redraw_after_id: Optional[str] = None
+        self.min_redraw_interval: float = 0.25
+        self._last_redraw: float = 0.0
+
+        # Axis label font, built once so Tk does not re-parse a font spec per label
+        self._label_font = tkfont.Font(root=master, font=AppFonts.SMALL)
 
         # Initial draw
         self._draw_grid()
@@ -60,57 +113,79 @@ class GraphWidget(tk.Canvas):
         # Handle resize
         self.bind("<Configure>", self._on_resize)
 
+    @property
+    def data(self) -> np.ndarray:
+        """Samples in chronological order (oldest first)."""
+        if self._count < self.capacity:
+            return self._ybuf[: self._count]
+        return np.concatenate((self._ybuf[self._head :], self._ybuf[: self._head]))
+
+    def _layout_x(self) -> None:
+        """Map buffer indices to whole-pixel X coordinates across the width."""
+        available_width = self.width - self.padding_left - self.padding_right
+        step_x = available_width / (self.capacity - 1)
+        xs = self._coords[0::2]
+        np.multiply(np.arange(self.capacity), step_x, out=xs)
+        np.add(xs, self.padding_left, out=xs)
+        np.rint(xs, out=xs)
+
     def _on_resize(self, event: tk.Event) -> None:
         self.width = event.width
         self.height = event.height
+        self._layout_x()
         self._draw_grid()
         self._redraw_line()
 
     def _draw_grid(self) -> None:
         """Draws background grid and labels."""
-        self.delete("grid")
-        self.delete("label")
-
         w = self.width
-        h = self.height
+        border = AppColors.BORDER
+        ts_color = AppColors.TEXT_SECONDARY
+        font = self._label_font
+        lines = self.grid_lines_ids
+        labels = self.label_ids
+        ticks = self._ticks
+
+        # Grid items are pooled: a rescale only moves/relabels existing items and
+        # creates or deletes the difference, instead of rebuilding the whole grid.
+        if len(lines) != len(ticks):
+            while len(lines) < len(ticks):
+                lines.append(
+                    self.create_line(0, 0, 0, 0, fill=border, dash=(2, 4), tags="grid")
+                )
+                labels.append(
+                    self.create_text(
+                        0, 0, fill=ts_color, anchor="e", font=font, tags="label"
+                    )
+                )
+            while len(lines) > len(ticks):
+                self.delete(lines.pop())
+                self.delete(labels.pop())
+
+            # New grid items are stacked on top, keep the data line above them
+            self.tag_raise("line")
 
         # Draw Y-axis grid lines (0, 50, 100, 150...)
-        # We want about 4-5 lines
-        step = int(self.y_max // 4) if self.y_max > 0 else 25
-        if step == 0:
-            step = 25
-
-        for y_val in range(0, int(self.y_max * 1.2) + step, step):
-            if y_val > self.y_max * 1.5:
+        x_start = self.padding_left
+        x_end = w - self.padding_right
+        x_label = self.padding_left - 5
+        for (y_val, text), line_id, label_id in zip(ticks, lines, labels):
+            y_pos = self._map_y(y_val)
+            self.coords(line_id, x_start, y_pos, x_end, y_pos)
+            self.coords(label_id, x_label, y_pos)
+            self.itemconfigure(label_id, text=text)
+
+    def _compute_ticks(self) -> Tuple[Tuple[float, str], ...]:
+        """Grid values (and their labels) for the current y_max."""
+        for bound, step in self._TICK_LADDER:
+            if self.y_max <= bound:
                 break
+        else:
+            step = 1000 * math.ceil(self.y_max / 4000)
 
-            y_pos = self._map_y(float(y_val))
-
-            # Don't draw if out of bounds
-            if y_pos < self.padding_top or y_pos > h - self.padding_bottom:
-                continue
-
-            # Line
-            self.create_line(
-                self.padding_left,
-                y_pos,
-                w - self.padding_right,
-                y_pos,
-                fill=AppColors.BORDER,
-                dash=(2, 4),
-                tags="grid",
-            )
-
-            # Label
-            self.create_text(
-                self.padding_left - 5,
-                y_pos,
-                text=str(y_val),
-                fill=AppColors.TEXT_SECONDARY,
-                anchor="e",
-                font=("Roboto", 8),
-                tags="label",
-            )
+        return tuple(
+            (float(y_val), str(y_val)) for y_val in range(0, int(self.y_max) + 1, step)
+        )
 
     def _map_y(self, value: float) -> float:
         """Map a data value to a Y coordinate on canvas."""
@@ -123,92 +198,118 @@ class GraphWidget(tk.Canvas):
         return (self.height - self.padding_bottom) - (ratio * available_height)
 
     def update_data(self, new_value: float) -> None:
-        """Add a new data point and update the graph."""
-        self.data.append(new_value)
-
-        # Auto-scale Y axis
-        current_max = max(self.data) if self.data else 0.0
-        target_max = max(100.0, current_max * 1.2)
+        """Add a new data point and schedule a graph update."""
+        if self._count == self.capacity and self._ybuf[self._head] >= self._running_max:
+            # Overwriting the oldest sample drops the current maximum
+            self._max_stale = True
+        if new_value >= self._running_max:
+            self._running_max = new_value
+            self._max_stale = False
+        self._ybuf[self._head] = new_value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+        # Defer painting; samples arriving before the next paint collapse into it
+        if self._redraw_after_id is None:
+            delay = self._last_redraw + self.min_redraw_interval - time.monotonic()
+            if delay > 0:
+                self._redraw_after_id = self.after(
+                    int(delay * 1000) + 1, self._flush_redraw
+                )
+            else:
+                self._redraw_after_id = self.after_idle(self._flush_redraw)
+
+    def _flush_redraw(self) -> None:
+        """Rescale if needed and repaint the line."""
+        self._redraw_after_id = None
+        self._last_redraw = time.monotonic()
+
+        # Auto-scale Y axis (whole units, so sub-unit jitter does not rescale)
+        if self._max_stale:
+            self._running_max = float(self._ybuf[: self._count].max())
+            self._max_stale = False
+        current_max = self._running_max
+        target_max = float(round(max(100.0, current_max * 1.2)))
 
         # Smooth scaling or instant? Instant for responsiveness, maybe dampen later
         if target_max != self.y_max:
             self.y_max = float(target_max)
+            self._ticks = self._compute_ticks()
             self._draw_grid()  # Re-draw grid if scale changes
 
         self._redraw_line()
 
     def _redraw_line(self) -> None:
         """Redraws the polyline."""
-        if not self.data:
+        num_points = self._count
+        if num_points < 2:
+            self._hide_line()
             return
 
-        points: List[float] = []
-        w = self.width
-        # X spacing: Spread data points across the available width
-        # We show the last N points.
-        # If we have fewer than max_points, we start from left.
-        # Ideally, it's a sliding window.
+        # "Fill then scroll": the oldest sample sits at the left edge and the
+        # history grows to the right until the buffer is full, then scrolls.
+        # Y values are mapped straight into the interleaved scratch buffer, in
+        # two segments once the ring has wrapped, so no per-frame arrays are built.
+        size = 2 * num_points
+        points = self._coords[:size]
+        ys = points[1::2]
+        if num_points < self.capacity:
+            self._map_into(self._ybuf[:num_points], ys)
+        else:
+            split = self.capacity - self._head
+            self._map_into(self._ybuf[self._head :], ys[:split])
+            self._map_into(self._ybuf[: self._head], ys[split:])
 
-        available_width = w - self.padding_left - self.padding_right
+        # Skip the Tcl round-trip when nothing would visibly move
+        drawn = self._drawn[:size]
+        if self._drawn_len == size and np.array_equal(points, drawn):
+            return
+        np.copyto(drawn, points)
+        self._drawn_len = size
 
-        # We want to display exactly 'maxlen' points filling the screen?
-        # Or relative to time?
-        # For simplicity in this APM graph, we assume constant update rate.
-        # We map indices to X.
+        self.coords(self.line_id, *points.tolist())
+        if not self._line_visible:
+            self.itemconfigure(self.line_id, state=tk.NORMAL)
+            self._line_visible = True
 
-        num_points = len(self.data)
-        if num_points < 2:
-            self.delete("line")
+    def _map_into(self, values: np.ndarray, out: np.ndarray) -> None:
+        """Vectorised _map_y: write whole-pixel Y coordinates of values into out."""
+        bottom = self.height - self.padding_bottom
+        if self.y_max == self.y_min:
+            out.fill(bottom)
             return
 
-        # Always map the last 60 points (or whatever maxlen is) to the width
-        # If we have 60 points, index 0 is at left, index 59 is at right.
-        # If we have 10 points, index 0 is at left, index 9 is at 10/60th of width?
-        # No, usually we want the graph to "fill" as it goes or "scroll".
-        # Let's do "fill then scroll".
-
-        max_capacity = self.data.maxlen if self.data.maxlen else 60
-
-        step_x = available_width / (max_capacity - 1)
-
-        for i, value in enumerate(self.data):
-            # If we are not full yet, should we stretch or just fill part?
-            # "Scroll" effect: Newest data is always at right edge?
-            # Or "Fill" effect: Newest data moves to right?
-            # Let's do "Newest at right edge" (Scroll)
-            # But if we have few points, they should be at the right?
-            # Standard monitoring graphs:
-            # Time 0: Point at left.
-            # Time 10: Point at 10s mark.
-            # Time 60: Point at right edge.
-            # Time 61: Shift left.
-
-            # So:
-            # x = padding_left + (i * step_x) -> This fills from left.
-            # When full, i=0 is pushed out.
-
-            # Wait, deque pops from left. So self.data[0] is the oldest.
-            # So self.data[0] should be at the left.
-            # self.data[-1] (newest) should be at the right?
-            # Yes, if full.
-
-            # If not full (e.g. 10 points), and max capacity is 60.
-            # Should self.data[0] be at left, and self.data[9] be at 1/6th?
-            # Yes, that looks like a history graph building up.
-
-            x = self.padding_left + (i * step_x)
-            y = self._map_y(value)
-            points.extend([x, y])
-
-        if self.line_id:
-            self.coords(self.line_id, *points)
-        else:
-            self.line_id = self.create_line(
-                *points, fill=AppColors.ACCENT, width=2, smooth=True, tags="line"
-            )
+        available_height = self.height - self.padding_top - self.padding_bottom
+        scale = available_height / (self.y_max - self.y_min)
+        np.subtract(values, self.y_min, out=out)
+        np.multiply(out, -scale, out=out)
+        np.add(out, bottom, out=out)
+        np.rint(out, out=out)
+
+    def _hide_line(self) -> None:
+        """Hide the data line without deleting the canvas item."""
+        if self._line_visible:
+            self.itemconfigure(self.line_id, state=tk.HIDDEN)
+            self._line_visible = False
+        self._drawn_len = 0
+
+    def _cancel_redraw(self) -> None:
+        """Drop a scheduled repaint, if any, so the widget stays quiescent."""
+        if self._redraw_after_id is not None:
+            self.after_cancel(self._redraw_after_id)
+            self._redraw_after_id = None
 
     def clear(self) -> None:
         """Clear the graph data."""
-        self.data.clear()
-        self.delete("line")
-        self.line_id = None
+        self._cancel_redraw()
+        self._head = 0
+        self._count = 0
+        self._running_max = 0.0
+        self._max_stale = False
+        self._hide_line()
+
+    def destroy(self) -> None:
+        """Cancel pending repaints before the widget goes away."""
+        self._cancel_redraw()
+        super().destroy()
@@ -5,8 +5,10 @@ Handles the main GUI logic and user interaction.
 
 import tkinter as tk
 import logging
+import threading
+import time
 from tkinter import ttk
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from src.utils.config import AppColors, AppFonts
 from src.core.exporter import DataExporter
@@ -23,18 +25,50 @@ class MainWindow:
     Coordinates between the UI, the Calculator, and the Exporter.
     """
 
+    _ERROR_BUDGET = 5
+    _ERROR_WINDOW = 60.0
+
+    # Prebuilt formatters for the per-tick metric labels
+    _INT_FMT = "{:d}".format
+    _TIME_FMT = "{:02d}:{:02d}:{:02d}".format
+
+    # Window size (pixels)
+    WIDTH = 600
+    HEIGHT = 800
+
+    # Metrics panel layout (pixels)
+    METRICS_WIDTH = 560
+    APM_CARD_HEIGHT = 90
+    STAT_CARD_HEIGHT = 64
+    CARD_GAP = 10
+
     def __init__(self, root: tk.Tk, calculator: APMCalculator) -> None:
         self.root = root
         self.calculator = calculator
         self.exporter = DataExporter()
 
+        # Single-slot handoff from the calculator thread to the Tk thread:
+        # only the latest metrics are kept and at most one paint is queued
+        self._metrics_lock = threading.Lock()
+        self._pending_metrics: Optional[Dict[str, Any]] = None
+        self._redraw_pending: bool = False
+
+        # Error log budget: at most _ERROR_BUDGET tracebacks per _ERROR_WINDOW
+        # seconds, so a failure repeating on every tick cannot flood the log file
+        self._err_budget: int = self._ERROR_BUDGET
+        self._err_window_start: float = time.monotonic()
+
+        # Last text rendered per metric item, to skip redundant Tk reconfigures
+        self._last_text: Dict[int, str] = {}
+
         # Register Observers
         self.calculator.add_observer(self.on_metrics_update)
         self.calculator.add_observer(self.exporter.export)
 
         # Window Setup
         self.root.title("APMLive")
-        self.root.geometry("600x800")
+        self._geometry = f"{self.WIDTH}x{self.HEIGHT}"
+        self.root.geometry(self._geometry)
         self.root.configure(bg=AppColors.BG_PRIMARY)
         self.root.resizable(False, False)
 
@@ -53,9 +87,9 @@ class MainWindow:
     def _center_window(self) -> None:
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
-        x = (screen_width - 600) // 2
-        y = (screen_height - 800) // 2
-        self.root.geometry(f"600x800+{x}+{y}")
+        x = (screen_width - self.WIDTH) // 2
+        y = (screen_height - self.HEIGHT) // 2
+        self.root.geometry(f"{self._geometry}+{x}+{y}")
 
     def _setup_styles(self) -> None:
         style = ttk.Style()
@@ -68,20 +102,6 @@ class MainWindow:
             foreground=AppColors.TEXT_PRIMARY,
         )
 
-        style.configure(
-            "Metric.TLabel",
-            font=AppFonts.METRIC_LARGE,
-            background=AppColors.BG_SECONDARY,
-            foreground=AppColors.ACCENT,
-        )
-
-        style.configure(
-            "Stat.TLabel",
-            font=AppFonts.STAT_VALUE,
-            background=AppColors.BG_TERTIARY,
-            foreground=AppColors.TEXT_PRIMARY,
-        )
-
     def _create_header(self) -> None:
         header_frame = tk.Frame(self.root, bg=AppColors.BG_PRIMARY, height=60)
         header_frame.pack(fill=tk.X, padx=20, pady=(10, 0))
@@ -95,7 +115,7 @@ class MainWindow:
             text="⚙",
             bg=AppColors.BG_TERTIARY,
             fg=AppColors.TEXT_PRIMARY,
-            font=("Roboto", 16),
+            font=AppFonts.ICON,
             relief=tk.FLAT,
             bd=0,
             padx=10,
@@ -111,7 +131,7 @@ class MainWindow:
             text="OFFLINE",
             bg=AppColors.BG_PRIMARY,
             fg=AppColors.TEXT_SECONDARY,
-            font=("Roboto", 10, "bold"),
+            font=AppFonts.BOLD,
         )
         self.status_label.pack(side=tk.RIGHT, pady=15)
 
@@ -120,50 +140,71 @@ class MainWindow:
         SettingsWindow(self.root, self.exporter)
 
     def _create_metrics(self) -> None:
-        metrics_frame = tk.Frame(self.root, bg=AppColors.BG_PRIMARY)
-        metrics_frame.pack(fill=tk.X, padx=20, pady=10)
+        # All metric cards are drawn on a single Canvas: per-tick updates are one
+        # itemconfigure per changed value, with no ttk style/geometry re-resolution
+        width = self.METRICS_WIDTH
+        apm_height = self.APM_CARD_HEIGHT
+        stat_top = apm_height + self.CARD_GAP
+        stat_height = self.STAT_CARD_HEIGHT
+
+        self.metrics_canvas = tk.Canvas(
+            self.root,
+            width=width,
+            height=stat_top + stat_height,
+            bg=AppColors.BG_PRIMARY,
+            highlightthickness=0,
+        )
+        self.metrics_canvas.pack(padx=20, pady=10)
+        canvas = self.metrics_canvas
 
         # Main APM Display
-        apm_card = tk.Frame(metrics_frame, bg=AppColors.BG_SECONDARY)
-        apm_card.pack(fill=tk.X, pady=(0, 10))
-
-        tk.Label(
-            apm_card,
+        canvas.create_rectangle(
+            0, 0, width, apm_height, fill=AppColors.BG_SECONDARY, outline=""
+        )
+        canvas.create_text(
+            width / 2,
+            20,
             text="ACTIONS PER MINUTE",
-            bg=AppColors.BG_SECONDARY,
-            fg=AppColors.TEXT_SECONDARY,
+            fill=AppColors.TEXT_SECONDARY,
             font=AppFonts.METRIC_TITLE,
-        ).pack(pady=(10, 2))
-
-        self.apm_label = ttk.Label(apm_card, text="0", style="Metric.TLabel")
-        self.apm_label.pack(pady=(0, 10))
+        )
+        self.apm_item = canvas.create_text(
+            width / 2, 56, text="0", fill=AppColors.ACCENT, font=AppFonts.METRIC_LARGE
+        )
 
-        # Stats Row
-        stats_row = tk.Frame(metrics_frame, bg=AppColors.BG_PRIMARY)
-        stats_row.pack(fill=tk.X)
+        # Stats Row: three equal cards with a 5px margin around each
+        card_width = (width - 6 * 5) / 3
 
         # Helper to create stat card
-        def create_stat_card(
-            parent: tk.Widget, title: str, initial_value: str
-        ) -> ttk.Label:
-            card = tk.Frame(parent, bg=AppColors.BG_TERTIARY)
-            card.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
-
-            tk.Label(
-                card,
+        def create_stat_card(index: int, title: str, initial_value: str) -> int:
+            x0 = 5 + index * (card_width + 10)
+            center = x0 + card_width / 2
+            canvas.create_rectangle(
+                x0,
+                stat_top,
+                x0 + card_width,
+                stat_top + stat_height,
+                fill=AppColors.BG_TERTIARY,
+                outline="",
+            )
+            canvas.create_text(
+                center,
+                stat_top + 18,
                 text=title,
-                bg=AppColors.BG_TERTIARY,
-                fg=AppColors.TEXT_SECONDARY,
+                fill=AppColors.TEXT_SECONDARY,
                 font=AppFonts.STAT_TITLE,
-            ).pack(pady=(10, 2))
-
-            label = ttk.Label(card, text=initial_value, style="Stat.TLabel")
-            label.pack(pady=(0, 10))
-            return label
-
-        self.total_label = create_stat_card(stats_row, "TOTAL ACTIONS", "0")
-        self.avg_label = create_stat_card(stats_row, "AVERAGE APM", "0")
-        self.time_label = create_stat_card(stats_row, "SESSION TIME", "00:00:00")
+            )
+            return canvas.create_text(
+                center,
+                stat_top + 42,
+                text=initial_value,
+                fill=AppColors.TEXT_PRIMARY,
+                font=AppFonts.STAT_VALUE,
+            )
+
+        self.total_item = create_stat_card(0, "TOTAL ACTIONS", "0")
+        self.avg_item = create_stat_card(1, "AVERAGE APM", "0")
+        self.time_item = create_stat_card(2, "SESSION TIME", "00:00:00")
 
     def _create_graph(self) -> None:
         graph_frame = tk.Frame(self.root, bg=AppColors.BG_SECONDARY)
@@ -174,7 +215,7 @@ class MainWindow:
             text="APM HISTORY (Last 60s)",
             bg=AppColors.BG_SECONDARY,
             fg=AppColors.TEXT_SECONDARY,
-            font=("Roboto", 9, "bold"),
+            font=AppFonts.SECTION_TITLE,
         ).pack(pady=(10, 5))
 
         # Replaced Matplotlib with custom Canvas GraphWidget
@@ -190,7 +231,7 @@ class MainWindow:
             text="START TRACKING",
             bg=AppColors.ACCENT,
             fg="white",
-            font=("Roboto", 12, "bold"),
+            font=AppFonts.BUTTON_LARGE,
             relief=tk.FLAT,
             pady=10,
             command=self.toggle_tracking,
@@ -217,29 +258,85 @@ class MainWindow:
 
     def on_metrics_update(self, metrics: Dict[str, Any]) -> None:
         """Callback received from APMCalculator when metrics are updated."""
-        # Schedule UI update on the main thread
+        with self._metrics_lock:
+            self._pending_metrics = metrics
+            # A paint is already queued; it will pick up these newer metrics
+            if self._redraw_pending:
+                return
+            self._redraw_pending = True
+
+        # Schedule UI update on the main thread, once pending events are handled
         try:
-            self.root.after(0, lambda: self._update_view(metrics))
+            self.root.after_idle(self._drain_metrics)
         except Exception as e:
-            logger.error("Failed to schedule UI update: %s", e, exc_info=True)
+            with self._metrics_lock:
+                self._redraw_pending = False
+            # The root is being destroyed (shutdown): nothing left to update
+            if isinstance(e, tk.TclError) and not self._root_exists():
+                return
+            self._log_error("Failed to schedule UI update: %s", e)
+
+    def _drain_metrics(self) -> None:
+        """Apply the most recent pending metrics (runs on the Tk thread)."""
+        with self._metrics_lock:
+            metrics = self._pending_metrics
+            self._pending_metrics = None
+            self._redraw_pending = False
+
+        if metrics is not None:
+            self._update_view(metrics)
 
     def _update_view(self, metrics: Dict[str, Any]) -> None:
         """Update UI elements with new metrics."""
         try:
             # Update Labels
-            self.apm_label.config(text=f"{int(metrics.get('current_apm', 0))}")
-            self.total_label.config(text=f"{metrics.get('total_actions', 0)}")
-            self.avg_label.config(text=f"{metrics.get('avg_apm', 0)}")
+            self._set_metric_text(
+                self.apm_item, self._INT_FMT(int(metrics.get("current_apm", 0)))
+            )
+            self._set_metric_text(
+                self.total_item, self._INT_FMT(int(metrics.get("total_actions", 0)))
+            )
+            self._set_metric_text(self.avg_item, str(metrics.get("avg_apm", 0)))
 
             # Format time
-            total_seconds = int(metrics.get("session_time", 0))
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            seconds = total_seconds % 60
-            self.time_label.config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+            hours, remainder = divmod(int(metrics.get("session_time", 0)), 3600)
+            minutes, seconds = divmod(remainder, 60)
+            self._set_metric_text(
+                self.time_item, self._TIME_FMT(hours, minutes, seconds)
+            )
 
             # Update Graph
             current_apm = float(metrics.get("current_apm", 0))
             self.graph.update_data(current_apm)
         except Exception as e:
-            logger.error("Error updating UI view: %s", e, exc_info=True)
+            self._log_error("Error updating UI view: %s", e)
+
+    def _root_exists(self) -> bool:
+        """Whether the Tk root window still exists."""
+        try:
+            return bool(self.root.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def _log_error(self, msg: str, error: Exception) -> None:
+        """Log an error with traceback, rate-limited to the error budget."""
+        now = time.monotonic()
+        if now - self._err_window_start >= self._ERROR_WINDOW:
+            self._err_budget = self._ERROR_BUDGET
+            self._err_window_start = now
+
+        if self._err_budget <= 0:
+            return
+        self._err_budget -= 1
+        logger.error(msg, error, exc_info=True)
+        if self._err_budget == 0:
+            logger.warning(
+                "Too many UI errors, suppressing further reports for %d s",
+                self._ERROR_WINDOW,
+            )
+
+    def _set_metric_text(self, item: int, text: str) -> None:
+        """Update a metric text item only when its displayed text actually changes."""
+        if self._last_text.get(item) != text:
+            self.metrics_canvas.itemconfigure(item, text=text)
+            self._last_text[item] = text
@@ -73,7 +73,7 @@ class SettingsWindow:
             text="Save",
             bg=AppColors.SUCCESS,
             fg="white",
-            font=("Roboto", 10, "bold"),
+            font=AppFonts.BOLD,
             relief=tk.FLAT,
             padx=20,
             pady=10,
@@ -85,7 +85,7 @@ class SettingsWindow:
             text="Cancel",
             bg=AppColors.BG_TERTIARY,
             fg=AppColors.TEXT_PRIMARY,
-            font=("Roboto", 10, "bold"),
+            font=AppFonts.BOLD,
             relief=tk.FLAT,
             padx=20,
             pady=10,
@@ -115,18 +115,17 @@ class SettingsWindow:
             text=title,
             bg=AppColors.BG_SECONDARY,
             fg=AppColors.TEXT_PRIMARY,
-            font=("Roboto", 10, "bold"),
+            font=AppFonts.BOLD,
         ).pack(anchor="w")
         tk.Label(
             info,
             text=desc,
             bg=AppColors.BG_SECONDARY,
             fg=AppColors.TEXT_SECONDARY,
-            font=("Roboto", 8),
+            font=AppFonts.SMALL,
         ).pack(anchor="w")
 
     def _save(self) -> None:
         new_settings = {k: v.get() for k, v in self.vars.items()}
-        self.exporter.txt_settings.update(new_settings)
-        self.exporter.save_settings()
+        self.exporter.update_settings(new_settings)
         self.window.destroy()
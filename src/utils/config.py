@@ -31,4 +31,8 @@ class AppFonts:
     STAT_VALUE = ("Roboto", 14, "bold")
     STAT_TITLE = ("Roboto", 9, "normal")
     NORMAL = ("Roboto", 10, "normal")
+    BOLD = ("Roboto", 10, "bold")
+    SECTION_TITLE = ("Roboto", 9, "bold")
+    BUTTON_LARGE = ("Roboto", 12, "bold")
+    ICON = ("Roboto", 16, "normal")
     SMALL = ("Roboto", 8, "normal")
@@ -4,59 +4,212 @@ Handles application-wide logging setup.
 """
 
 import os
+import atexit
+import functools
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import (
+    MemoryHandler,
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+)
 from pathlib import Path
+from typing import Any, List, Optional
+
+# Attribute under which the background QueueListener is stored on the logger
+_LISTENER_ATTR = "_apmlive_listener"
+# Attribute marking a logger already configured by setup_logger
+_INITIALIZED_ATTR = "_apmlive_initialized"
+
+
+class _BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler writing through a large buffer.
+    The stream is flushed on WARNING and above, every FLUSH_EVERY records and
+    on close, not after each record. The file size is tracked in memory, so
+    the rollover check does not seek (which would flush the buffer) either.
+    """
+
+    FLUSH_EVERY = 512
+
+    def __init__(self, *args: Any, buffering: int = 64 * 1024, **kwargs: Any) -> None:
+        self.buffering = buffering
+        self._size = 0  # Characters in the current file, as RotatingFileHandler
+        self._unflushed = 0
+        super().__init__(*args, **kwargs)
+
+    def _open(self) -> Any:
+        stream = open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffering,
+            encoding=self.encoding,
+            # FileHandler only has "errors" from Python 3.9 on
+            errors=getattr(self, "errors", None),
+        )
+        self._size = stream.tell()
+        return stream
+
+    def _would_overflow(self, length: int) -> bool:
+        """Whether writing length more characters must roll the file over."""
+        return (
+            self.maxBytes > 0
+            and self._size > 0
+            and self._size + length >= self.maxBytes
+            # See bpo-45401: never roll over anything other than regular files
+            and os.path.isfile(self.baseFilename)
+        )
+
+    def doRollover(self) -> None:
+        self._size = 0
+        self._unflushed = 0
+        super().doRollover()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self._would_overflow(len(msg)):
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._size += len(msg)
+            self._unflushed += 1
+            if record.levelno >= logging.WARNING or self._unflushed >= self.FLUSH_EVERY:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        super().flush()
+        self._unflushed = 0
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_log_dir() -> Optional[Path]:
+    """
+    Platform log directory, resolved and created once per process.
+    Returns None (also cached) when the directory cannot be created.
+    """
+    if sys.platform == "win32":
+        local_app_data = os.getenv("LOCALAPPDATA")
+        if local_app_data:
+            log_dir = Path(local_app_data) / "APMLive" / "logs"
+        else:
+            log_dir = Path.cwd() / "logs"
+    else:
+        log_dir = Path.home() / ".apmlive" / "logs"
+
+    try:
+        log_dir.mkdir(parents=True, exist_ok=True)
+    except (OSError, PermissionError) as e:
+        sys.stderr.write(f"APMLive: failed to create log file: {e}\n")
+        return None
+    return log_dir
 
 
 def setup_logger(name: str = "APMLive") -> logging.Logger:
     """
     Configure and return a logger instance.
     Logs are written to %LOCALAPPDATA%/APMLive/app.log and console.
+    Callers only enqueue records; formatting and I/O happen on a background
+    QueueListener thread so logging never blocks the UI or input threads.
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-
-    # Prevent adding handlers multiple times
-    if logger.handlers:
+    # Configure once: later calls skip directory resolution and handler setup
+    if getattr(logger, _INITIALIZED_ATTR, False):
         return logger
+    logger.setLevel(logging.DEBUG)
 
     # Formatters
     file_formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     console_formatter = logging.Formatter("%(levelname)s: %(message)s")
+    handlers: List[logging.Handler] = []
 
     # 1. File Handler (Rotating)
     # Determine log directory
-    if sys.platform == "win32":
-        local_app_data = os.getenv("LOCALAPPDATA")
-        if local_app_data:
-            log_dir = Path(local_app_data) / "APMLive" / "logs"
-        else:
-            log_dir = Path.cwd() / "logs"
-    else:
-        log_dir = Path.home() / ".apmlive" / "logs"
+    log_dir = _resolve_log_dir()
 
-    try:
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / "app.log"
+    if log_dir is not None:
+        try:
+            log_file = log_dir / "app.log"
+            # The handler opens the file lazily, so probe it here: an unopenable
+            # log falls back to console-only once, not with an error per record
+            with open(log_file, "a", encoding="utf-8"):
+                pass
 
-        file_handler = RotatingFileHandler(
-            log_file, maxBytes=1024 * 1024, backupCount=5, encoding="utf-8"
-        )
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+            # Large rotation threshold: a normal session never rotates mid-run.
+            # delay=True defers opening the file until the first record is written,
+            # and records reach the disk through a 64 KB buffer.
+            file_handler = _BufferedRotatingFileHandler(
+                log_file,
+                maxBytes=16 * 1024 * 1024,
+                backupCount=3,
+                encoding="utf-8",
+                delay=True,
+                buffering=64 * 1024,
+            )
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(file_formatter)
 
-    except (OSError, PermissionError) as e:
-        print(f"Failed to create log file: {e}")
+            # Batch file writes: records are buffered and written 512 at a time,
+            # or at once when a WARNING arrives or the logger is shut down
+            file_buffer = MemoryHandler(
+                capacity=512,
+                flushLevel=logging.WARNING,
+                target=file_handler,
+                flushOnClose=True,
+            )
+            file_buffer.setLevel(logging.INFO)
+            handlers.append(file_buffer)
+
+        except (OSError, PermissionError) as e:
+            sys.stderr.write(f"APMLive: failed to create log file: {e}\n")
 
     # 2. Console Handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG)
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
+
+    # 3. Queue: the logger only enqueues, the listener thread does the I/O
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    setattr(logger, _LISTENER_ATTR, listener)
+    # Flush queued records on interpreter exit; a no-op if already shut down
+    atexit.register(shutdown_logger, name)
+    setattr(logger, _INITIALIZED_ATTR, True)
 
     return logger
+
+
+def shutdown_logger(name: str = "APMLive") -> None:
+    """Flush pending records and stop the background listener of a logger."""
+    logger = logging.getLogger(name)
+    listener: Optional[QueueListener] = getattr(logger, _LISTENER_ATTR, None)
+    if listener is not None:
+        # Detach the queue first: records logged after shutdown must not go to
+        # a queue nobody drains, and a later setup_logger() configures afresh
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+                handler.close()
+        setattr(logger, _INITIALIZED_ATTR, False)
+        listener.stop()
+        setattr(logger, _LISTENER_ATTR, None)
+        # Write out records still held by buffering handlers (and their files)
+        for handler in listener.handlers:
+            if isinstance(handler, MemoryHandler):
+                handler.flush()
+                if handler.target is not None:
+                    handler.target.flush()
@@ -2,7 +2,11 @@ import pytest
 import time
 import threading
 from unittest.mock import MagicMock, patch
-from src.core.calculator import APMCalculator
+from pynput import keyboard
+from src.core.calculator import APMCalculator, TimestampBuffer
+
+# Action timestamps are time.perf_counter_ns() values
+NS = 1_000_000_000
 
 
 @pytest.fixture
@@ -11,6 +15,7 @@ def calculator():
     # Mock listeners to avoid actual hardware hooks during tests
     calc.mouse_listener = MagicMock()
     calc.keyboard_listener = MagicMock()
+    calc.keyboard_listener.canonical.side_effect = lambda key: key
     return calc
 
 
@@ -23,7 +28,7 @@ def test_initial_state(calculator):
 
 def test_action_recording(calculator):
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
 
     # Record 60 actions
     for _ in range(60):
@@ -35,14 +40,15 @@ def test_action_recording(calculator):
 
 def test_apm_calculation(calculator):
     calculator.running = True
-    calculator.session_start = time.time() - 60  # Session started 60s ago
+    # Session started 60s ago
+    calculator.session_start = time.perf_counter_ns() - 60 * NS
 
     # Simulate 60 actions spread over the last minute
     # Ideally 1 action per second = 60 APM
-    current_time = time.time()
+    current_time = time.perf_counter_ns()
+    timestamps = [current_time - i * NS for i in reversed(range(60))]
     with calculator._lock:
-        for i in range(60):
-            calculator.actions.append(current_time - i)
+        calculator.actions.extend(timestamps)
         calculator.total_actions = 60
 
     metrics = calculator.get_metrics()
@@ -94,7 +100,7 @@ def test_start_stop(calculator):
         # 3. Stop
         calculator.stop()
         assert calculator.running is False
-        assert calculator._stop_event.is_set()
+        assert calculator._stop is True
 
         # Check listeners stopped
         calculator.mouse_listener.stop.assert_called_once()
@@ -110,28 +116,45 @@ def test_start_stop(calculator):
 def test_update_loop(calculator):
     """Test the background update loop."""
     # We want to run the loop for a short time and verify it calls notify_observers
-    calculator._stop_event.clear()
+    calculator._stop = False
 
-    # Mock notify_observers to track calls
-    calculator._notify_observers = MagicMock()
+    # Mock notify_observers to track calls and signal the first one
+    notified = threading.Event()
+    calculator._notify_observers = MagicMock(side_effect=notified.set)
 
     # Create a thread to run the loop
     t = threading.Thread(target=calculator._update_loop)
     t.start()
 
-    # Wait until called (polling)
-    start_time = time.time()
-    while calculator._notify_observers.call_count == 0:
-        if time.time() - start_time > 2.0:
-            break
-        time.sleep(0.05)
+    # Wait until called
+    notified.wait(timeout=2.0)
 
-    calculator._stop_event.set()
+    calculator._stop = True
+    calculator._flush_event.set()
     t.join(timeout=1.0)
 
     assert calculator._notify_observers.call_count >= 1
 
 
+def test_record_action_requests_flush(calculator):
+    """Test that bursts of actions wake the update loop early."""
+    calculator.running = True
+    calculator.session_start = time.perf_counter_ns()
+    calculator.flush_interval = 3600  # Only the action-count trigger applies
+
+    # First action after a pause flushes immediately
+    calculator._record_action()
+    assert calculator._flush_event.is_set()
+    calculator._flush_event.clear()
+
+    for _ in range(calculator.flush_every - 1):
+        calculator._record_action()
+    assert not calculator._flush_event.is_set()
+
+    calculator._record_action()
+    assert calculator._flush_event.is_set()
+
+
 def test_observer_pattern(calculator):
     """Test adding, removing, and notifying observers."""
     mock_observer = MagicMock()
@@ -146,7 +169,7 @@ def test_observer_pattern(calculator):
 
     # Notify
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
     calculator._notify_observers()
     mock_observer.assert_called_once()
 
@@ -165,7 +188,7 @@ def test_observer_error_handling(calculator):
     calculator.add_observer(bad_observer)
 
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
 
     # Should not raise exception
     try:
@@ -177,7 +200,7 @@ def test_observer_error_handling(calculator):
 def test_input_handlers(calculator):
     """Test the actual input callback methods."""
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
 
     # Mouse
     calculator._on_click(0, 0, None, True)  # Pressed
@@ -191,6 +214,58 @@ def test_input_handlers(calculator):
     assert calculator.total_actions == 2
 
 
+def test_key_repeat_ignored(calculator):
+    """Test that auto-repeat events of a held key count as a single action."""
+    calculator.running = True
+    calculator.session_start = time.perf_counter_ns()
+
+    # Holding a key: OS sends repeated press events without release
+    for _ in range(5):
+        calculator._on_press("a")
+    assert calculator.total_actions == 1
+
+    # A different key while "a" is held still counts
+    calculator._on_press("b")
+    assert calculator.total_actions == 2
+
+    # Releasing and pressing again counts as a new action
+    calculator._on_release("a")
+    calculator._on_press("a")
+    assert calculator.total_actions == 3
+
+
+def test_key_release_matches_press_across_modifiers(calculator):
+    """Test that a key released with another case does not stay held."""
+    calculator.running = True
+    calculator.session_start = time.perf_counter_ns()
+    calculator.keyboard_listener = keyboard.Listener()
+
+    # Shift goes down between the press of "a" and its release
+    calculator._on_press(keyboard.KeyCode.from_char("a"))
+    calculator._on_release(keyboard.KeyCode.from_char("A"))
+
+    calculator._on_press(keyboard.KeyCode.from_char("a"))
+    assert calculator.total_actions == 2
+
+
+def test_shifted_key_release_after_shift(calculator):
+    """Test that Shift released before its number key does not leave it held."""
+    calculator.running = True
+    calculator.session_start = time.perf_counter_ns()
+    calculator.keyboard_listener = keyboard.Listener()
+    one = 0x31
+
+    # Shift+1 reports "!", but "1" once Shift is up again
+    calculator._on_press(keyboard.Key.shift)
+    calculator._on_press(keyboard.KeyCode(vk=one, char="!"))
+    calculator._on_release(keyboard.Key.shift)
+    calculator._on_release(keyboard.KeyCode(vk=one, char="1"))
+
+    calculator._on_press(keyboard.Key.shift)
+    calculator._on_press(keyboard.KeyCode(vk=one, char="!"))
+    assert calculator.total_actions == 4
+
+
 def test_record_action_not_running(calculator):
     """Test _record_action when not running."""
     calculator.running = False
@@ -202,24 +277,27 @@ def test_record_action_not_running(calculator):
 def test_buffer_cleanup(calculator):
     """Test that old actions are removed from the buffer."""
     calculator.running = True
-    calculator.session_start = time.time() - 100
+    calculator.session_start = time.perf_counter_ns() - 100 * NS
 
-    current_time = time.time()
+    current_time = time.perf_counter_ns()
 
     # 1. Test cleanup during recording (_record_action)
+    calculator.actions = TimestampBuffer(capacity=2)
     with calculator._lock:
-        calculator.actions.append(current_time - 80)  # 80s ago (older than 60+10)
+        # 80s ago (older than 60+10)
+        calculator.actions.append(current_time - 80 * NS)
+        calculator.actions.append(current_time - 75 * NS)
 
-    # Add new action, should trigger cleanup
+    # Add new action to a full buffer, should trigger cleanup
     calculator._record_action()
 
-    # The old action should be removed because 80 > 70
+    # The old actions should be removed because 80, 75 > 70
     assert len(calculator.actions) == 1  # Only the new one remains
 
     # 2. Test cleanup during metrics calculation (get_metrics)
     calculator.actions.clear()
     with calculator._lock:
-        calculator.actions.append(current_time - 65)  # 65s ago (older than 60)
+        calculator.actions.append(current_time - 65 * NS)  # 65s ago (older than 60)
 
     metrics = calculator.get_metrics()
 
@@ -233,17 +311,17 @@ def test_buffer_cleanup(calculator):
 def test_aps_calculation_edge_cases(calculator):
     """Test APS calculation including edge cases."""
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
 
     # Case 1: Session < 10s
     # 5 actions in 5 seconds
-    current_time = time.time()
+    current_time = time.perf_counter_ns()
     with calculator._lock:
-        for i in range(5):
-            calculator.actions.append(current_time - i)
+        for i in reversed(range(5)):
+            calculator.actions.append(current_time - i * NS)
         calculator.total_actions = 5
         # Mock session start to be 5s ago
-        calculator.session_start = current_time - 5
+        calculator.session_start = current_time - 5 * NS
 
     metrics = calculator.get_metrics()
     # APS = 5 actions / 5 seconds = 1.0
@@ -253,11 +331,11 @@ def test_aps_calculation_edge_cases(calculator):
     # 10 actions in last 10s
     with calculator._lock:
         calculator.actions.clear()
-        for i in range(10):
-            calculator.actions.append(current_time - i)
+        for i in reversed(range(10)):
+            calculator.actions.append(current_time - i * NS)
         calculator.total_actions = 10
         # Mock session start to be 20s ago
-        calculator.session_start = current_time - 20
+        calculator.session_start = current_time - 20 * NS
 
     metrics = calculator.get_metrics()
     # APS = 10 actions / 10s (fixed window) = 1.0
@@ -268,7 +346,7 @@ def test_aps_calculation_edge_cases(calculator):
     with calculator._lock:
         calculator.actions.clear()
         calculator.total_actions = 0
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
     metrics = calculator.get_metrics()
     assert metrics["aps"] == 0.0
 
@@ -277,12 +355,12 @@ def test_aps_calculation_edge_cases(calculator):
     with calculator._lock:
         calculator.actions.clear()
         calculator.total_actions = 10
-    calculator.session_start = time.time()  # 0s duration (approx)
+    calculator.session_start = time.perf_counter_ns()  # 0s duration (approx)
     metrics = calculator.get_metrics()
     # It might be slightly > 0 due to execution time, so we check if duration logic works
     # If duration is effectively 0, avg_apm should be 0
     # To force 0 duration, we can set start time to future slightly
-    calculator.session_start = time.time() + 1
+    calculator.session_start = time.perf_counter_ns() + NS
     metrics = calculator.get_metrics()
     assert metrics["avg_apm"] == 0.0
 
@@ -290,9 +368,9 @@ def test_aps_calculation_edge_cases(calculator):
     # Add actions older than 10s
     with calculator._lock:
         calculator.actions.clear()
-        calculator.actions.append(current_time - 15)  # 15s ago
+        calculator.actions.append(current_time - 15 * NS)  # 15s ago
         # Ensure session is long enough for loop to check timestamps
-        calculator.session_start = current_time - 20
+        calculator.session_start = current_time - 20 * NS
 
     metrics = calculator.get_metrics()
     assert metrics["aps"] == 0.0
@@ -302,7 +380,7 @@ def test_aps_calculation_edge_cases(calculator):
     with calculator._lock:
         calculator.actions.clear()
         calculator.total_actions = 0
-    calculator.session_start = current_time - 5  # 5s duration
+    calculator.session_start = current_time - 5 * NS  # 5s duration
     metrics = calculator.get_metrics()
     assert metrics["aps"] == 0.0
 
@@ -310,7 +388,7 @@ def test_aps_calculation_edge_cases(calculator):
 def test_apm_calculation_zero_window(calculator):
     """Test APM calculation when time window is 0."""
     calculator.running = True
-    calculator.session_start = time.time()
+    calculator.session_start = time.perf_counter_ns()
     # time_window = min(window_size, session_duration)
     # if session_duration is 0, time_window is 0
     metrics = calculator.get_metrics()
@@ -318,9 +396,47 @@ def test_apm_calculation_zero_window(calculator):
     assert metrics["avg_apm"] == 0.0
 
 
+def test_get_metrics_cached_within_tick(calculator):
+    """Test that metrics are reused within a time bucket until an action arrives."""
+    calculator.running = True
+    now = time.perf_counter_ns()
+    calculator.session_start = now - 30 * NS
+
+    with patch("src.core.calculator.time.perf_counter_ns", return_value=now):
+        first = calculator.get_metrics()
+        assert calculator.get_metrics() is first
+
+        calculator._record_action()
+        second = calculator.get_metrics()
+        assert second is not first
+        assert second["total_actions"] == 1
+
+
 def test_get_metrics_not_running(calculator):
     """Test metrics when not running."""
     calculator.running = False
     metrics = calculator.get_metrics()
     assert metrics["current_apm"] == 0
     assert metrics["session_time"] == 0
+
+
+def test_timestamp_buffer():
+    """Test appends and eviction of the timestamp buffer."""
+    buf = TimestampBuffer(capacity=8)
+    buf.extend([1, 2, 3])
+    buf.append(4)
+    assert len(buf) == 4
+
+    buf.drop_before(2)  # Cutoff is inclusive
+    assert buf.view().tolist() == [2, 3, 4]
+    buf.drop_first(1)
+    assert buf.view().tolist() == [3, 4]
+
+    # Appending past the end compacts or grows without losing entries
+    buf.extend(range(5, 40))
+    assert len(buf) == 37
+    assert buf.view().tolist() == list(range(3, 40))
+
+    buf.clear()
+    assert len(buf) == 0
+    assert buf.view().tolist() == []
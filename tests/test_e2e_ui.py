@@ -6,40 +6,66 @@ Only the hardware input listeners (pynput) are mocked to ensure reliability in C
 
 import pytest
 import tkinter as tk
-import time
-import queue
+import threading
+from collections import deque
 from unittest.mock import MagicMock, patch
 from src.ui.main_window import MainWindow
 from src.core.calculator import APMCalculator
 
 
-@pytest.fixture
-def e2e_app():
+class CallbackQueue(deque):
+    """Captured Tk callbacks. deque append/popleft are atomic, no lock needed."""
+
+    def empty(self):
+        return not self
+
+
+def metric_text(app, item):
+    """Return the text currently displayed by a metrics canvas item."""
+    return app.metrics_canvas.itemcget(item, "text")
+
+
+@pytest.fixture(scope="module")
+def tk_root():
     """
-    Fixture that sets up the full application in a real Tkinter root.
-    Handles setup and teardown of the application lifecycle.
+    One real Tkinter root shared by the tests of this module.
+    Tk initialisation is the slowest part of the setup, so it is paid once.
     """
-    # Create a real Tkinter root
     try:
         root = tk.Tk()
     except tk.TclError as e:
         pytest.skip(f"Skipping E2E UI tests: Tcl/Tk not initialized correctly ({e})")
 
     root.withdraw()
+    yield root
+    root.destroy()
+
+
+@pytest.fixture
+def e2e_app(tk_root):
+    """
+    Fixture that sets up the full application on the shared Tkinter root.
+    Handles setup and teardown of the application lifecycle.
+    """
+    root = tk_root
 
     # Create a thread-safe queue for callbacks to handle threaded updates
     # This circumvents the "main thread is not in main loop" error in tests
-    callback_queue = queue.Queue()
+    callback_queue = CallbackQueue()
 
-    # Mock root.after to capture callbacks from background threads
+    # Mock root.after/after_idle to capture callbacks from background threads
     def mock_after(delay, func=None, *args):
         if func:
-            callback_queue.put((func, args))
+            callback_queue.append((func, args))
             return "dummy_id"
         return "dummy_id"
 
-    # Patch the instance method
+    def mock_after_idle(func, *args):
+        return mock_after(0, func, *args)
+
+    # Patch the instance methods
     root.after = mock_after
+    root.after_idle = mock_after_idle
 
     # Mock hardware listeners
     with patch("pynput.mouse.Listener") as MockMouse, patch(
@@ -64,11 +90,14 @@ def e2e_app():
 
         yield app, calculator, root, callback_queue
 
-        # Teardown
+        # Teardown: stop tracking and remove this test's widgets, keep the root
         if app.running:
             app.toggle_tracking()
 
-        root.destroy()
+        for child in root.winfo_children():
+            child.destroy()
+        del root.after
+        del root.after_idle
 
 
 def test_e2e_complete_workflow(e2e_app):
@@ -87,7 +116,7 @@ def test_e2e_complete_workflow(e2e_app):
     def process_events():
         root.update()
         while not callback_queue.empty():
-            func, args = callback_queue.get()
+            func, args = callback_queue.popleft()
             try:
                 func(*args)
             except Exception as e:
@@ -97,8 +126,8 @@ def test_e2e_complete_workflow(e2e_app):
     # --- 1. Verify Initial State ---
     assert app.running is False
     assert app.start_btn.cget("text") == "START TRACKING"
-    assert app.apm_label.cget("text") == "0"
-    assert app.total_label.cget("text") == "0"
+    assert metric_text(app, app.apm_item) == "0"
+    assert metric_text(app, app.total_item) == "0"
 
     # --- 2. Start Tracking ---
     print("\n[E2E] Clicking Start Button...")
@@ -113,30 +142,32 @@ def test_e2e_complete_workflow(e2e_app):
     # --- 3. Simulate User Activity ---
     print("[E2E] Simulating user inputs...")
 
+    # Observer registered after the UI's: once it sees all actions, the UI
+    # update carrying them has already been posted
+    all_counted = threading.Event()
+
+    def wait_for_actions(metrics):
+        if metrics["total_actions"] >= 10:
+            all_counted.set()
+
+    calculator.add_observer(wait_for_actions)
+
     # Inject 10 actions
     for _ in range(5):
         calculator._on_press("key")
+        calculator._on_release("key")
         calculator._on_click(0, 0, None, True)
 
-    # Wait for the update loop
-    max_wait = 2.0
-    start_time = time.time()
-
-    # Wait until the UI reflects the actions
-    while time.time() - start_time < max_wait:
-        process_events()
-        time.sleep(0.05)
-
-        # Check if UI is updated
-        if app.total_label.cget("text") == "10":
-            break
+    # Wait for the update loop, then apply the posted UI update
+    all_counted.wait(timeout=2.0)
+    process_events()
 
     # --- 4. Verify Live Updates ---
-    current_total = app.total_label.cget("text")
+    current_total = metric_text(app, app.total_item)
     print(f"[E2E] UI shows total actions: {current_total}")
     assert current_total == "10", "UI did not update with total actions"
 
-    current_apm = int(app.apm_label.cget("text"))
+    current_apm = int(metric_text(app, app.apm_item))
     print(f"[E2E] UI shows APM: {current_apm}")
     assert current_apm > 0, "APM should be > 0 after actions"
 
@@ -149,8 +180,8 @@ def test_e2e_complete_workflow(e2e_app):
     assert app.start_btn.cget("text") == "START TRACKING"
 
     # --- 6. Verify Final State ---
-    assert app.total_label.cget("text") == "10"
-    assert int(app.apm_label.cget("text")) == current_apm
+    assert metric_text(app, app.total_item) == "10"
+    assert int(metric_text(app, app.apm_item)) == current_apm
 
 
 def test_e2e_settings_navigation(e2e_app):
@@ -165,7 +196,7 @@ def test_e2e_settings_navigation(e2e_app):
     def process_events():
         root.update()
         while not callback_queue.empty():
-            func, args = callback_queue.get()
+            func, args = callback_queue.popleft()
             func(*args)
             root.update()
 
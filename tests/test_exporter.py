@@ -3,7 +3,7 @@ import json
 import threading
 import pytest
 from unittest.mock import patch, MagicMock, mock_open
-from src.core.exporter import DataExporter
+from src.core.exporter import DataExporter, _format_duration, _resolve_data_dir
 
 
 # Mock logger to prevent actual logging during tests
@@ -13,6 +13,14 @@ def mock_logger():
         yield mock
 
 
+@pytest.fixture(autouse=True)
+def fresh_data_dir_cache():
+    """Resolve the data directory anew in each test (it is cached per process)."""
+    _resolve_data_dir.cache_clear()
+    yield
+    _resolve_data_dir.cache_clear()
+
+
 @pytest.fixture
 def mock_data_dir(tmp_path):
     return str(tmp_path)
@@ -42,6 +50,16 @@ def test_exporter_init_custom_dir(mock_data_dir):
     assert os.path.exists(custom_dir)
 
 
+def test_data_dir_resolved_once(mock_data_dir):
+    """Test that the default data directory is only resolved on first use."""
+    with patch("os.getenv", return_value=mock_data_dir) as mock_getenv:
+        first = DataExporter()
+        second = DataExporter()
+
+    assert first.data_dir == second.data_dir
+    mock_getenv.assert_called_once_with("LOCALAPPDATA")
+
+
 def test_load_settings_success(mock_data_dir):
     """Test loading settings from a valid JSON file."""
     exporter = DataExporter(data_dir=mock_data_dir)
@@ -116,8 +134,39 @@ def test_update_settings(mock_data_dir):
     assert os.path.exists(exporter.settings_file)
 
 
+def test_render_txt_follows_updated_settings(mock_data_dir):
+    """Test that the cached TXT layout is rebuilt when settings change."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+    metrics = {"current_apm": 60.7, "total_actions": 10, "session_time": 65}
+
+    assert exporter._render_txt(metrics) == b"APM: 60 | Total: 10 | Time: 00:01:05"
+
+    exporter.update_settings({"total_actions": False, "session_time": False})
+    assert exporter._render_txt(metrics) == b"APM: 60"
+
+
+def test_write_files_json_fallback(mock_data_dir):
+    """Test that JSON export works without the optional orjson package."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+
+    with patch("src.core.exporter.orjson", None):
+        exporter._write_files({"current_apm": 75.5})
+
+    with open(exporter.json_file, "r") as f:
+        assert json.load(f) == {"current_apm": 75.5}
+
+
+@pytest.mark.parametrize(
+    "seconds, expected",
+    [(0, "00:00:00"), (3665, "01:01:05"), (86399, "23:59:59"), (360000, "100:00:00")],
+)
+def test_format_duration(seconds, expected):
+    """Test HH:MM:SS formatting, including sessions of 100 hours or more."""
+    assert _format_duration(seconds) == expected
+
+
 def test_export_threading(mock_data_dir):
-    """Test that export runs in a separate thread."""
+    """Test that export hands metrics to a single persistent writer thread."""
     exporter = DataExporter(data_dir=mock_data_dir)
     metrics = {"test": 1}
 
@@ -125,9 +174,72 @@ def test_export_threading(mock_data_dir):
         exporter.export(metrics)
         mock_thread.assert_called_once()
         args = mock_thread.call_args[1]
-        assert args["target"] == exporter._write_files
-        assert args["args"] == (metrics,)
+        assert args["target"] == exporter._writer_loop
         assert args["daemon"] is True
+        assert exporter._export_queue.qsize() == 1
+
+        # The writer is reused, and newer metrics replace the pending ones
+        newer = {"test": 2}
+        exporter.export(newer)
+        mock_thread.assert_called_once()
+        assert exporter._export_queue.qsize() == 1
+        assert exporter._export_queue.get_nowait() is newer
+
+
+def test_writer_loop_writes_metrics(mock_data_dir):
+    """Test that the writer thread writes queued metrics."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+    written = threading.Event()
+
+    with patch.object(
+        exporter, "_write_files", side_effect=lambda m: written.set()
+    ) as mock_write:
+        exporter.export({"current_apm": 42})
+        assert written.wait(timeout=2.0)
+
+    mock_write.assert_called_once_with({"current_apm": 42})
+    assert exporter._export_thread.is_alive()
+
+
+def test_writer_loop_survives_unexpected_errors(mock_data_dir, mock_logger):
+    """Test that an unexpected write error does not stop later exports."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+    failed = threading.Event()
+    written = threading.Event()
+    mock_logger.error.side_effect = lambda *args, **kwargs: failed.set()
+
+    def write(metrics):
+        if metrics["current_apm"] == 1:
+            raise OverflowError("boom")
+        written.set()
+
+    with patch.object(exporter, "_write_files", side_effect=write):
+        exporter.export({"current_apm": 1})
+        assert failed.wait(timeout=2.0)
+        exporter.export({"current_apm": 2})
+        assert written.wait(timeout=2.0)
+
+    assert exporter._export_thread.is_alive()
+
+
+def test_close_stops_writer_before_closing_files(mock_data_dir):
+    """Test that close() drains and joins the writer, and later exports are ignored."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+
+    exporter.export({"current_apm": 42})
+    writer = exporter._export_thread
+    exporter.close()
+
+    # The pending export was written, then nothing was left open
+    assert not writer.is_alive()
+    assert not exporter._handles
+    with open(exporter.output_file, "r") as f:
+        assert f.read().startswith("APM: 42")
+
+    exporter.export({"current_apm": 7})
+    assert exporter._export_thread is writer
+    assert exporter._export_queue.empty()
+    assert not exporter._handles
 
 
 def test_write_files_success(mock_data_dir):
@@ -172,6 +284,45 @@ def test_write_files_success(mock_data_dir):
         assert "Time: 01:01:05" in content
 
 
+def test_write_files_rewrites_in_place(mock_data_dir):
+    """Test that export files stay open and shorter content replaces longer."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+
+    exporter._write_files({"current_apm": 1000, "total_actions": 123456})
+    handles = dict(exporter._handles)
+    exporter._write_files({"current_apm": 5, "total_actions": 1})
+
+    # Same handles reused, no stale bytes left from the longer first write
+    assert exporter._handles == handles
+    with open(exporter.output_file, "r") as f:
+        assert f.read() == "APM: 5 | Total: 1 | Time: 00:00:00"
+    with open(exporter.json_file, "r") as f:
+        assert json.load(f) == {"current_apm": 5, "total_actions": 1}
+
+    exporter.close()
+    assert not exporter._handles
+    assert all(f.closed for f in handles.values())
+
+
+def test_write_files_skips_unchanged_content(mock_data_dir):
+    """Test that identical exports do not rewrite the files."""
+    exporter = DataExporter(data_dir=mock_data_dir)
+    metrics = {"current_apm": 60, "total_actions": 10, "session_time": 5}
+
+    exporter._write_files(metrics)
+    # Mark the file from outside: an unchanged export must leave it alone
+    with open(exporter.output_file, "w") as f:
+        f.write("untouched")
+
+    exporter._write_files(dict(metrics))
+    with open(exporter.output_file, "r") as f:
+        assert f.read() == "untouched"
+
+    exporter._write_files(dict(metrics, session_time=6))
+    with open(exporter.output_file, "r") as f:
+        assert f.read() == "APM: 60 | Total: 10 | Time: 00:00:06"
+
+
 def test_write_files_partial_settings(mock_data_dir):
     """Test writing files with partial settings disabled."""
     exporter = DataExporter(data_dir=mock_data_dir)
@@ -1,35 +1,139 @@
+import ast
 import os
 import sys
+import time
+from pathlib import Path
 import logging
 import pytest
 from unittest.mock import patch, MagicMock
-from src.utils.logger import setup_logger
+from logging.handlers import QueueHandler
+from src.utils.logger import (
+    setup_logger,
+    shutdown_logger,
+    _BufferedRotatingFileHandler,
+    _resolve_log_dir,
+)
+
+
+def _reset_logger(logger):
+    """Stop the listener and close/remove the handlers, keeping the same list."""
+    listener = getattr(logger, "_apmlive_listener", None)
+    shutdown_logger(logger.name)
+    # Close the listener's file handlers too, so no log file stays open
+    for h in listener.handlers if listener is not None else ():
+        target = getattr(h, "target", None)
+        h.close()
+        if target is not None:
+            target.close()
+    for h in list(logger.handlers):
+        h.close()
+        logger.removeHandler(h)
+    logger.propagate = True
+    logger.disabled = False
+    if hasattr(logger, "_apmlive_initialized"):
+        delattr(logger, "_apmlive_initialized")
+    _resolve_log_dir.cache_clear()
+
+
+class _FakePath:
+    """Minimal stand-in for a log directory Path: supports "/", mkdir(), open()."""
+
+    def __truediv__(self, other):
+        return self
+
+    def mkdir(self, **kwargs):
+        pass
+
+    def __fspath__(self):
+        # The log file probe opens the path: point it at a harmless file
+        return os.devnull
 
 
 @pytest.fixture
 def clean_logger():
-    """Remove all handlers from the logger before and after each test."""
+    """Remove all handlers (and the cached log directory) around each test."""
     logger = logging.getLogger("APMLive")
-    # Clear existing handlers
-    logger.handlers = []
+    _reset_logger(logger)
     yield
-    logger.handlers = []
+    _reset_logger(logger)
 
 
-def test_setup_logger_basic(clean_logger):
-    """Test basic logger setup."""
+def test_setup_logger_emits_via_handler(clean_logger, caplog):
+    """Test that a configured logger emits records at DEBUG level and above."""
     logger = setup_logger("APMLive")
     assert logger.name == "APMLive"
     assert logger.level == logging.DEBUG
-    # Should have at least a console handler
-    assert len(logger.handlers) >= 1
+
+    logging.getLogger("APMLive").info("x")
+    assert "x" in caplog.text
+    assert caplog.records[-1].name == "APMLive"
+
+
+def test_setup_logger_uses_queue(clean_logger):
+    """Test that I/O handlers run behind a QueueListener, not on the caller."""
+    logger = setup_logger("APMLive")
+
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], QueueHandler)
+
+    listener = logger._apmlive_listener
+    assert any(
+        isinstance(h, logging.StreamHandler) for h in listener.handlers
+    ), "Console handler should be attached to the listener"
+
+
+def test_setup_logger_stops_listener_at_exit(clean_logger):
+    """Test that the listener is stopped at exit, and stopping twice is safe."""
+    with patch("src.utils.logger.atexit.register") as mock_register:
+        logger = setup_logger("APMLive")
+
+    mock_register.assert_called_once_with(shutdown_logger, "APMLive")
+    assert logger._apmlive_listener is not None
+
+    shutdown_logger("APMLive")
+    shutdown_logger("APMLive")  # atexit after an explicit shutdown
+    assert logger._apmlive_listener is None
+
+    # Nothing is left queuing records for the stopped listener
+    assert not logger.handlers
+
+    # The logger can be configured again after a shutdown
+    with patch("src.utils.logger.atexit.register"):
+        assert setup_logger("APMLive") is logger
+    assert logger._apmlive_listener is not None
+    assert len(logger.handlers) == 1
+
+
+def test_shutdown_logger_flushes_buffered_records(clean_logger, tmp_path):
+    """Test that records buffered for the log file are written on shutdown."""
+    with patch("src.utils.logger._resolve_log_dir", return_value=tmp_path):
+        logger = setup_logger("APMLive")
+    logger.info("buffered record")
+
+    shutdown_logger("APMLive")
+
+    assert "buffered record" in (tmp_path / "app.log").read_text(encoding="utf-8")
+
+
+def test_warning_reaches_log_file_without_shutdown(clean_logger, tmp_path):
+    """Test that a WARNING is written through both buffers right away."""
+    with patch("src.utils.logger._resolve_log_dir", return_value=tmp_path):
+        logger = setup_logger("APMLive")
+    logger.warning("disk warning")
+
+    log_file = tmp_path / "app.log"
+    deadline = time.monotonic() + 2.0
+    while "disk warning" not in log_file.read_text(encoding="utf-8"):
+        assert time.monotonic() < deadline, "WARNING was not flushed to app.log"
+        time.sleep(0.01)
 
 
 def test_setup_logger_existing_handlers(clean_logger):
-    """Test that setup_logger returns existing logger if it already has handlers."""
+    """Test that setup_logger returns an already configured logger untouched."""
     logger = logging.getLogger("APMLive")
     handler = logging.StreamHandler()
     logger.addHandler(handler)
+    logger._apmlive_initialized = True
 
     logger_new = setup_logger("APMLive")
     assert logger_new is logger
@@ -37,61 +141,60 @@ def test_setup_logger_existing_handlers(clean_logger):
     assert logger_new.handlers[0] is handler
 
 
-@patch("sys.platform", "win32")
-@patch("os.getenv")
-@patch("src.utils.logger.Path")
-@patch("src.utils.logger.RotatingFileHandler")
-def test_setup_logger_windows_localaapdata(
-    mock_rfh, mock_path, mock_getenv, clean_logger
-):
-    """Test logger setup on Windows with LOCALAPPDATA."""
-    mock_getenv.return_value = r"C:\Users\Test\AppData\Local"
-
-    # Mock Path behavior
-    mock_path_obj = MagicMock()
-    mock_path.return_value = mock_path_obj
-    mock_path_obj.__truediv__.return_value = mock_path_obj  # Support / operator
-
-    setup_logger("APMLive")
-
-    # Check if Path was instantiated
-    assert mock_path.called
+def test_setup_logger_configures_once(clean_logger):
+    """Test that repeated calls do not resolve the log directory again."""
+    first = setup_logger("APMLive")
 
-    # Check if RotatingFileHandler was instantiated
-    assert mock_rfh.called
+    with patch("src.utils.logger._resolve_log_dir") as mock_resolve:
+        second = setup_logger("APMLive")
 
+    assert second is first
+    assert len(second.handlers) == 1
+    mock_resolve.assert_not_called()
 
-@patch("sys.platform", "win32")
-@patch("os.getenv")
-@patch("src.utils.logger.Path")
-def test_setup_logger_windows_no_localaapdata(mock_path, mock_getenv, clean_logger):
-    """Test logger setup on Windows without LOCALAPPDATA."""
-    mock_getenv.return_value = None
 
-    # Mock Path.cwd()
-    mock_cwd = MagicMock()
-    mock_path.cwd.return_value = mock_cwd
-    mock_cwd.__truediv__.return_value = mock_cwd
+@pytest.mark.parametrize(
+    "platform, env, expect",
+    [
+        ("win32", r"C:\Users\Test\AppData\Local", "Path"),
+        ("win32", None, "Path.cwd"),
+        ("linux", None, "Path.home"),
+    ],
+)
+def test_setup_logger_platform_log_dir(
+    platform, env, expect, monkeypatch, clean_logger
+):
+    """Test the log directory base on Windows (with/without LOCALAPPDATA) and Linux."""
+    monkeypatch.setattr(sys, "platform", platform)
+    if env is None:
+        monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    else:
+        monkeypatch.setenv("LOCALAPPDATA", env)
+
+    # Only the Path class itself needs call tracking; the paths are plain fakes
+    mock_path = MagicMock()
+    mock_path.return_value = _FakePath()
+    mock_path.cwd.return_value = _FakePath()
+    mock_path.home.return_value = _FakePath()
+    mock_rfh = MagicMock()
+    monkeypatch.setattr("src.utils.logger.Path", mock_path)
+    monkeypatch.setattr("src.utils.logger._BufferedRotatingFileHandler", mock_rfh)
 
     setup_logger("APMLive")
 
-    # Should use cwd
-    assert mock_path.cwd.called
-
-
-@patch("sys.platform", "linux")
-@patch("src.utils.logger.Path")
-def test_setup_logger_linux(mock_path, clean_logger):
-    """Test logger setup on Linux (non-win32)."""
-    # Mock Path.home()
-    mock_home = MagicMock()
-    mock_path.home.return_value = mock_home
-    mock_home.__truediv__.return_value = mock_home
-
-    setup_logger("APMLive")
+    # The expected base directory was used
+    used = mock_path
+    for attr in expect.split(".")[1:]:
+        used = getattr(used, attr)
+    assert used.called
+    assert mock_rfh.called
 
-    # Should use home
-    assert mock_path.home.called
+    # The file handler is driven by the background listener
+    listener = logging.getLogger("APMLive")._apmlive_listener
+    assert listener is not None
+    assert any(
+        getattr(h, "target", None) is mock_rfh.return_value for h in listener.handlers
+    )
 
 
 @patch("src.utils.logger.Path")
@@ -99,6 +202,8 @@ def test_setup_logger_permission_error(mock_path, clean_logger, capsys):
     """Test handling of permission error when creating log directory."""
     mock_path_obj = MagicMock()
     mock_path.return_value = mock_path_obj
+    mock_path.home.return_value = mock_path_obj
+    mock_path.cwd.return_value = mock_path_obj
     mock_path_obj.__truediv__.return_value = mock_path_obj
 
     # Raise OSError when mkdir is called
@@ -107,19 +212,41 @@ def test_setup_logger_permission_error(mock_path, clean_logger, capsys):
     logger = setup_logger("APMLive")
 
     captured = capsys.readouterr()
-    assert "Failed to create log file" in captured.out
+    assert "failed to create log file" in captured.err
+    assert captured.out == ""
 
+    # The failure is cached: the directory is not probed again
+    assert _resolve_log_dir() is None
+    mock_path_obj.mkdir.assert_called_once()
 
-def test_log_rotation_configuration():
+
+def test_setup_logger_unopenable_log_file(clean_logger, tmp_path, capsys):
+    """Test that an app.log that cannot be opened is reported once on stderr."""
+    (tmp_path / "app.log").mkdir()
+
+    with patch("src.utils.logger._resolve_log_dir", return_value=tmp_path):
+        logger = setup_logger("APMLive")
+
+    listener = logger._apmlive_listener
+    assert [type(h) for h in listener.handlers] == [logging.StreamHandler]
+
+    logger.info("still logging")
+    shutdown_logger("APMLive")
+    captured = capsys.readouterr()
+    assert "APMLive: failed to create log file:" in captured.err
+    assert captured.err.count("failed to create log file") == 1
+    assert "Logging error" not in captured.err
+    assert captured.out == ""
+
+
+def test_log_rotation_configuration(clean_logger):
     """
     Verify that log rotation is configured correctly to prevent infinite growth.
-    Requirement: maxBytes should be reasonable (e.g. 1MB) and backupCount limited (e.g. 5).
+    Requirement: maxBytes should be reasonable (16MB) and backupCount limited (3).
     """
-    with patch("src.utils.logger.RotatingFileHandler") as MockRFH:
-        # Reset logger handlers to force recreation
-        logger = logging.getLogger("APMLive")
-        logger.handlers = []
-
+    with patch("src.utils.logger._BufferedRotatingFileHandler") as MockRFH, patch(
+        "src.utils.logger.MemoryHandler"
+    ) as MockMemory:
         setup_logger("APMLive")
 
         # Verify RotatingFileHandler was initialized with correct parameters
@@ -127,13 +254,109 @@ def test_log_rotation_configuration():
         call_args = MockRFH.call_args
         _, kwargs = call_args
 
-        # Check maxBytes (1MB = 1048576 bytes)
+        # Check maxBytes (16MB = 16777216 bytes)
         assert (
-            kwargs.get("maxBytes") == 1024 * 1024
-        ), "Log rotation maxBytes should be 1MB"
+            kwargs.get("maxBytes") == 16 * 1024 * 1024
+        ), "Log rotation maxBytes should be 16MB"
+
+        # Check backupCount (3 files)
+        assert kwargs.get("backupCount") == 3, "Log rotation backupCount should be 3"
 
-        # Check backupCount (5 files)
-        assert kwargs.get("backupCount") == 5, "Log rotation backupCount should be 5"
+        # File is only opened on first write
+        assert kwargs.get("delay") is True, "Log file opening should be delayed"
 
         # Check encoding
         assert kwargs.get("encoding") == "utf-8", "Log encoding should be utf-8"
+
+        # Writes go through a 64KB buffer, not flushed per record
+        assert kwargs.get("buffering") == 64 * 1024, "Log writes should be buffered"
+
+        # File writes are batched through a MemoryHandler
+        _, memory_kwargs = MockMemory.call_args
+        assert memory_kwargs.get("target") is MockRFH.return_value
+        assert memory_kwargs.get("capacity") == 512
+        # Same level at which the file handler flushes its own buffer
+        assert memory_kwargs.get("flushLevel") == logging.WARNING
+
+
+def test_buffered_file_handler_flushes_on_warning(tmp_path):
+    """Test that INFO records stay buffered until a WARNING forces a flush."""
+    log_file = tmp_path / "app.log"
+    handler = _BufferedRotatingFileHandler(
+        log_file, maxBytes=1024 * 1024, encoding="utf-8", delay=True
+    )
+
+    def record(level, msg):
+        return logging.LogRecord("APMLive", level, __file__, 0, msg, None, None)
+
+    try:
+        handler.handle(record(logging.INFO, "quiet"))
+        assert log_file.read_text(encoding="utf-8") == ""
+
+        handler.handle(record(logging.WARNING, "loud"))
+        assert log_file.read_text(encoding="utf-8") == "quiet\nloud\n"
+    finally:
+        handler.close()
+
+
+def test_buffered_file_handler_rolls_over_by_tracked_size(tmp_path):
+    """Test that rollover uses the in-memory size of the current file."""
+    log_file = tmp_path / "app.log"
+    log_file.write_text("x" * 90, encoding="utf-8")
+    handler = _BufferedRotatingFileHandler(
+        log_file, maxBytes=100, backupCount=1, encoding="utf-8"
+    )
+
+    try:
+        handler.handle(
+            logging.LogRecord(
+                "APMLive", logging.WARNING, __file__, 0, "y" * 20, None, None
+            )
+        )
+    finally:
+        handler.close()
+
+    assert (tmp_path / "app.log.1").read_text(encoding="utf-8") == "x" * 90
+    assert log_file.read_text(encoding="utf-8") == "y" * 20 + "\n"
+
+
+def _eager_debug_calls(source):
+    """Line numbers of logger.debug() calls whose message is built eagerly."""
+    lines = []
+    for node in ast.walk(ast.parse(source)):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "debug"
+            and node.args
+        ):
+            msg = node.args[0]
+            if (
+                isinstance(msg, ast.JoinedStr)
+                or (isinstance(msg, ast.BinOp) and isinstance(msg.op, ast.Mod))
+                or (
+                    isinstance(msg, ast.Call)
+                    and isinstance(msg.func, ast.Attribute)
+                    and msg.func.attr == "format"
+                )
+            ):
+                lines.append(node.lineno)
+    return lines
+
+
+def test_debug_calls_are_lazy():
+    """
+    Debug messages must use lazy %-style arguments, so a disabled debug call
+    returns before any string is built (no f-strings, % or str.format).
+    """
+    assert _eager_debug_calls('logger.debug(f"apm={apm}")') == [1]
+    assert _eager_debug_calls('logger.debug("apm=%d", apm)') == []
+
+    src_dir = Path(__file__).resolve().parent.parent / "src"
+    offenders = [
+        f"{path.relative_to(src_dir.parent)}:{lineno}"
+        for path in sorted(src_dir.rglob("*.py"))
+        for lineno in _eager_debug_calls(path.read_text(encoding="utf-8"))
+    ]
+    if offenders:
+        pytest.fail("Eagerly formatted logger.debug calls: " + ", ".join(offenders))
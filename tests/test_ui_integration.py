@@ -2,25 +2,74 @@
 UI Integration Tests
 """
 
+import contextlib
+import functools
 import pytest
-import tkinter as tk
-from unittest.mock import MagicMock, patch
-from src.ui.main_window import MainWindow
-from src.core.calculator import APMCalculator
+from unittest.mock import DEFAULT, MagicMock, patch
+
+# Skip (rather than error) at collection when the Tk bindings are missing
+tk = pytest.importorskip("tkinter")
+
+
+# tkinter widgets MainWindow creates, replaced by mocks when running without Tk
+_TK_WIDGETS = (
+    "Label",
+    "Button",
+    "Frame",
+    "Entry",
+    "StringVar",
+    "IntVar",
+    "BooleanVar",
+    "Checkbutton",
+    "Canvas",
+)
+
+
+@contextlib.contextmanager
+def _maybe_patch_tk(mock):
+    """Patch the Tk widgets (yielding the tkinter mocks by name) when mock is True."""
+    if not mock:
+        yield {}
+        return
+    tk_patch = patch.multiple("tkinter", **dict.fromkeys(_TK_WIDGETS, DEFAULT))
+    ttk_patch = patch.multiple("tkinter.ttk", Style=DEFAULT, Label=DEFAULT)
+    with tk_patch as mocks, ttk_patch, patch("src.ui.main_window.GraphWidget"):
+        yield mocks
+
+
+@functools.lru_cache(maxsize=1)
+def _tk_available() -> bool:
+    """Check (once, on first use) if Tkinter is available/working."""
+    try:
+        root = tk.Tk()
+        root.destroy()
+        return True
+    except tk.TclError:
+        return False
+
 
-# Check if Tkinter is available/working
-try:
+@pytest.fixture(scope="session")
+def tk_session_root():
+    """One hidden Tk root for the whole test session (None without Tk)."""
+    if not _tk_available():
+        yield None
+        return
     root = tk.Tk()
+    root.withdraw()
+    yield root
     root.destroy()
-    TK_AVAILABLE = True
-except tk.TclError:
-    TK_AVAILABLE = False
 
 
 @pytest.fixture
-def mock_tk_root():
+def use_mock(force_mock):
+    """Run against mocked widgets when requested or when Tk is unavailable."""
+    return force_mock or not _tk_available()
+
+
+@pytest.fixture
+def mock_tk_root(tk_session_root, use_mock):
     """Create a mock root window without showing it."""
-    if not TK_AVAILABLE:
+    if use_mock:
         # Return a MagicMock that simulates a Tk root
         root = MagicMock()
         # Mock common Tk methods used by MainWindow
@@ -29,34 +78,28 @@ def mock_tk_root():
         root.winfo_screenheight.return_value = 1080
         yield root
     else:
-        root = tk.Tk()
+        # A fresh Toplevel per test on the shared root: Tk is initialised once
+        root = tk.Toplevel(tk_session_root)
         root.withdraw()  # Hide the window
         yield root
         root.destroy()
 
 
-def test_ui_startup(mock_tk_root):
+@pytest.mark.parametrize("force_mock", [False, True])
+def test_ui_startup(mock_tk_root, use_mock):
     """
     Test if the MainWindow can be instantiated without errors.
     """
-    if not TK_AVAILABLE:
-        # If Tk is not available, we need to patch tkinter.Label, tkinter.Button etc.
-        # because MainWindow instantiates them.
-        with patch("tkinter.Label"), patch("tkinter.Button"), patch(
-            "tkinter.Frame"
-        ), patch("tkinter.Entry"), patch("tkinter.StringVar"), patch(
-            "tkinter.IntVar"
-        ), patch(
-            "tkinter.BooleanVar"
-        ), patch(
-            "tkinter.Checkbutton"
-        ):
-            _run_ui_startup_test(mock_tk_root)
-    else:
-        _run_ui_startup_test(mock_tk_root)
+    # Without a real Tk, the widgets MainWindow instantiates are patched
+    with _maybe_patch_tk(use_mock):
+        _run_ui_startup_test(mock_tk_root, use_mock)
 
 
-def _run_ui_startup_test(root):
+def _run_ui_startup_test(root, mocked):
+    # Imported here so collecting other test modules does not load the UI stack
+    from src.core.calculator import APMCalculator
+    from src.ui.main_window import MainWindow
+
     calculator = APMCalculator()
     try:
         app = MainWindow(root, calculator)
@@ -64,44 +107,38 @@ def _run_ui_startup_test(root):
         # Verify critical components are created
         assert app.root is root
         assert app.calculator is calculator
-        assert hasattr(app, "apm_label")
+        assert hasattr(app, "apm_item")
         assert hasattr(app, "start_btn")
 
         # Verify initial state
         assert app.running is False
         # If we are mocking widgets, we can't check cget easily unless we mock that too
-        if TK_AVAILABLE:
+        if not mocked:
             assert app.start_btn.cget("text") == "START TRACKING"
 
     except Exception as e:
         pytest.fail(f"UI failed to initialize: {e}")
 
 
-def test_ui_toggle_tracking(mock_tk_root):
+@pytest.mark.parametrize("force_mock", [False, True])
+def test_ui_toggle_tracking(mock_tk_root, use_mock):
     """
     Test the start/stop button logic.
     """
-    if not TK_AVAILABLE:
-        with patch("tkinter.Label"), patch("tkinter.Button") as MockButton, patch(
-            "tkinter.Frame"
-        ), patch("tkinter.Entry"), patch("tkinter.StringVar"), patch(
-            "tkinter.IntVar"
-        ), patch(
-            "tkinter.BooleanVar"
-        ), patch(
-            "tkinter.Checkbutton"
-        ):
-
+    with _maybe_patch_tk(use_mock) as mocks:
+        mock_btn_instance = None
+        if use_mock:
             # Setup MockButton to return an object with configure method
             mock_btn_instance = MagicMock()
-            MockButton.return_value = mock_btn_instance
+            mocks["Button"].return_value = mock_btn_instance
 
-            _run_ui_toggle_tracking_test(mock_tk_root, mock_btn_instance)
-    else:
-        _run_ui_toggle_tracking_test(mock_tk_root, None)
+        _run_ui_toggle_tracking_test(mock_tk_root, mock_btn_instance)
 
 
 def _run_ui_toggle_tracking_test(root, mock_btn):
+    from src.core.calculator import APMCalculator
+    from src.ui.main_window import MainWindow
+
     calculator = APMCalculator()
     # Mock calculator methods to avoid actual hardware hooks
     calculator.start = MagicMock()
@@ -116,9 +153,9 @@ def _run_ui_toggle_tracking_test(root, mock_btn):
     app.toggle_tracking()
     assert app.running is True
 
-    if TK_AVAILABLE:
+    if mock_btn is None:
         assert app.start_btn.cget("text") == "STOP TRACKING"
-    elif mock_btn:
+    else:
         # Check if configure was called with text="STOP TRACKING"
         # Note: tkinter widgets use configure(text=...) or config(text=...)
         # And cget is used to get values.
@@ -131,7 +168,7 @@ def _run_ui_toggle_tracking_test(root, mock_btn):
     app.toggle_tracking()
     assert app.running is False
 
-    if TK_AVAILABLE:
+    if mock_btn is None:
         assert app.start_btn.cget("text") == "START TRACKING"
 
     calculator.stop.assert_called_once()